@@ -26,16 +26,28 @@
 #   - threads  : Number of concurrent benches to run
 #   - sets     : Number of times to repeat this experiment
 #   - expected : None, or an expected value, which if not matched raises Exceptions
+#   - cpus     : None, or a list of CPU sets, to pin each of the concurrent benches to
 #
 # run_benchmark() may raise utils.OpenBenchBadBenchException.
 # An associated error message, including the binary name, is included
+#
+# run_interleaved_benchmarks() repeats run_benchmark() for several engines,
+# alternating their order each sample (ABBA), so that thermal throttling and
+# turbo decay land on every engine alike. sample_statistics() then trims the
+# outlying samples and reports a mean, along with a relative 95% confidence
+#
+# run_spot_check() runs one short, fixed-node search over UCI, and returns the
+# speed the engine reported. It is only meaningful relative to another spot check
 
+import math
 import multiprocessing
 import os
 import queue
 import re
+import statistics
 import subprocess
 import sys
+import threading
 
 ## Local imports must only use "import x", never "from x import ..."
 
@@ -43,6 +55,13 @@ import utils
 
 MAX_BENCH_TIME_SECONDS = 60
 
+# Two-sided 95% critical values of Student's t, by degrees of freedom
+T_CRITICAL_95 = {
+    1 : 12.706,  2 : 4.303,  3 : 3.182,  4 : 2.776,  5 : 2.571,
+    6 :  2.447,  7 : 2.365,  8 : 2.306,  9 : 2.262, 10 : 2.228,
+   12 :  2.179, 15 : 2.131, 20 : 2.086, 30 : 2.042,
+}
+
 def parse_stream_output(stream):
 
     nps = bench = None # Search through output Stream
@@ -68,7 +87,11 @@ def parse_stream_output(stream):
     bench = int(re.search(r'\d+', bench).group()) if bench else None
     return (bench, nps)
 
-def single_core_bench(binary, network, private, outqueue):
+def single_core_bench(binary, network, private, outqueue, cpus=None):
+
+    # Pin ourselves, and thus the engine, to a fixed set of CPUs
+    if cpus:
+        os.sched_setaffinity(0, cpus)
 
     # Basic command for Public engines
     cmd = ['./%s' % (binary), 'bench']
@@ -87,13 +110,13 @@ def single_core_bench(binary, network, private, outqueue):
     except: # Signal an error with (None, None)
         outqueue.put((None, None))
 
-def multi_core_bench(binary, network, private, threads):
+def multi_core_bench(binary, network, private, threads, cpus=None):
 
     outqueue = multiprocessing.Queue()
 
     processes = [
         multiprocessing.Process(
-            target=single_core_bench, args=(binary, network, private, outqueue))
+            target=single_core_bench, args=(binary, network, private, outqueue, cpus[ii] if cpus else None))
         for ii in range(threads)
     ]
 
@@ -111,13 +134,13 @@ def multi_core_bench(binary, network, private, threads):
         for process in processes:
             process.join()
 
-def run_benchmark(binary, network, private, threads, sets, expected=None):
+def run_benchmark(binary, network, private, threads, sets, expected=None, cpus=None):
 
     engine = os.path.basename(binary)
 
     benches, speeds = [], []
     for ii in range(sets):
-        for bench, speed in multi_core_bench(binary, network, private, threads):
+        for bench, speed in multi_core_bench(binary, network, private, threads, cpus):
             benches.append(bench); speeds.append(speed)
 
     if len(set(benches)) != 1:
@@ -130,3 +153,86 @@ def run_benchmark(binary, network, private, threads, sets, expected=None):
         raise utils.OpenBenchBadBenchException('[%s] Wrong Bench: %d' % (engine, benches[0]))
 
     return sum(speeds) // len(speeds), benches[0]
+
+def run_spot_check(binary, network, private, nodes, cpus=None):
+
+    # A single fixed-node search over UCI, which is far cheaper than a full bench.
+    # Returns the last nps the engine reported, or None if it reported none
+
+    commands = ['uci']
+    if network and private:
+        commands.append('setoption name EvalFile value %s' % (network))
+    commands += ['isready', 'position startpos', 'go nodes %d' % (nodes)]
+
+    pinning = { 'preexec_fn' : lambda: os.sched_setaffinity(0, cpus) } if cpus else {}
+
+    try: # Text mode, tolerating any output which is not valid UTF-8
+        process = subprocess.Popen(['./%s' % (binary)], stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors='replace', **pinning)
+    except OSError:
+        return None
+
+    # Never wait longer than a full bench would be allowed to take
+    watchdog = threading.Timer(MAX_BENCH_TIME_SECONDS, process.kill)
+    watchdog.start()
+
+    try:
+        process.stdin.write('\n'.join(commands) + '\n')
+        process.stdin.flush()
+
+        nps = None
+        for line in process.stdout:
+
+            if (match := re.search(r'\bnps (\d+)', line)):
+                nps = int(match.group(1))
+
+            if line.startswith('bestmove'):
+                process.stdin.write('quit\n')
+                process.stdin.flush()
+                return nps
+
+    except OSError: # The engine exited, or was killed by the watchdog
+        return None
+
+    finally:
+        watchdog.cancel()
+        process.kill()
+        process.wait()
+
+def run_interleaved_benchmarks(engines, threads, samples, cpus=None):
+
+    # engines is a list of (binary, network, private, expected) tuples
+    speeds = [[] for engine in engines]
+
+    for ii in range(samples):
+
+        # Alternate the order each sample, to cancel out any drift over time
+        order = range(len(engines)) if ii % 2 == 0 else reversed(range(len(engines)))
+
+        for idx in order:
+            binary, network, private, expected = engines[idx]
+            speed, nodes = run_benchmark(binary, network, private, threads, 1, expected, cpus)
+            speeds[idx].append(speed)
+
+    return speeds
+
+def t_critical_95(dof):
+
+    # Use the nearest tabulated value at or below dof, which errs on the wide side
+    below = [x for x in T_CRITICAL_95 if x <= dof]
+    return T_CRITICAL_95[max(below)] if dof <= 30 else 1.960
+
+def sample_statistics(samples, trim=0.20):
+
+    # Discard the same number of samples from either end
+    ordered = sorted(samples)
+    cut     = int(len(ordered) * trim)
+    kept    = ordered[cut:len(ordered)-cut] if cut else ordered
+
+    mean = statistics.mean(kept)
+    if len(kept) < 2 or not mean:
+        return mean, float('inf')
+
+    # Relative half-width of the 95% confidence interval of the mean
+    error = statistics.stdev(kept) / math.sqrt(len(kept))
+    return mean, t_critical_95(len(kept) - 1) * error / mean
@@ -101,6 +101,9 @@ def parse_arguments():
     p.add_argument('-S', '--server'             , help=help_server              , required=req_server)
     p.add_argument(      '--clean'              , help='Force New Client'       , action='store_true')
     p.add_argument(      '--no-client-downloads', help='NEVER download a client', action='store_true')
+    p.add_argument(      '--relay'              , help='Run a caching relay on [host:]port, on localhost if no host', required=False)
+    p.add_argument(      '--relay-cache'        , help='Folder for the relay cache'       , default='RelayCache')
+    p.add_argument(      '--relay-budget'       , help='MB of disk for the relay cache'   , default=16384)
 
     # Override, to possibly print worker.py's help as well as client.py's
     p.print_help = lambda: custom_help(p.format_help())
@@ -170,6 +173,11 @@ if __name__ == '__main__':
 
     from client import BadVersionException
 
+    # Serve artifacts to the workers of this site, rather than being a worker
+    if args.relay:
+        import relay
+        relay.run_relay(args.relay, args.server, args.relay_cache, args.relay_budget)
+
     while True:
 
         try:
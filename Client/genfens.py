@@ -25,23 +25,32 @@
 #   ./engine "genfens N seed S book <None|Books/book.epd> <?extra>" "quit"
 #
 # This work is split over many engines. If a workload requires 1024 openings,
-# and there are 16 threads, then each thread will generate 64 openings.
+# and there are 16 threads, then each thread will generate 64 openings. All of
+# the engines are run from a single asyncio loop, which reads every stdout at
+# once, and writes each opening to the book as soon as it arrives.
+#
+# When a Workload has many match runners, the book may instead be generated one
+# slice at a time, each slice holding exactly one runner's openings. Each slice
+# draws its own seeds from genfens_slice_seeds(), so no two slices are alike.
+# Slices may use fewer threads, and be pinned to CPUs, via args['cpus'].
 #
 # create_genfens_opening_book() may raise utils.OpenBenchFailedGenfensException.
-# This occurs when longer than 15 seconds has elapsed since getting an opening.
-# This should only occur if one or more of the engine processes has stalled.
+# This occurs when any one engine goes longer than GENFENS_STALL_SECONDS without
+# printing a line, or exits before providing all of its openings.
 
+import asyncio
+import hashlib
 import math
 import os
-import queue
-import subprocess
 import time
-import multiprocessing
 
 ## Local imports must only use "import x", never "from x import ..."
 
 import utils
 
+GENFENS_STALL_SECONDS = 15          # Silence from any one engine, before giving up on it
+GENFENS_LINE_LIMIT    = 1024 * 1024 # Longest line of engine output that can be read
+
 def genfens_required_openings_each(config):
 
     runner_cnt  = config.workload['distribution']['runner-count']
@@ -51,6 +60,19 @@ def genfens_required_openings_each(config):
 
     return math.ceil(total_games / config.threads)
 
+def genfens_required_openings_slice(config, threads):
+
+    games_per = config.workload['distribution']['games-per-runner']
+    repeat    = config.workload['test']['play_reverses']
+
+    return math.ceil(games_per // (1 + repeat) / threads)
+
+def genfens_slice_seeds(seeds, slice_idx):
+
+    # Mix the slice into each seed, keeping them within the range the server uses
+    mixed = [hashlib.sha256(b'%d:%d' % (seed, slice_idx)).digest() for seed in seeds]
+    return [int.from_bytes(digest[:4], 'little') & 0x7FFFFFFF for digest in mixed]
+
 def genfens_book_input_name(config):
 
     book_name = config.workload['test']['book']['name']
@@ -70,19 +92,58 @@ def genfens_command_builder(args, index):
 
     return command
 
-def genfens_single_threaded(command, queue):
+async def genfens_single_engine(args, index, on_opening):
+
+    # Engines may be confined to the given CPUs, which they then inherit for all threads
+    cpus    = args.get('cpus')
+    pinning = { 'preexec_fn' : lambda: os.sched_setaffinity(0, cpus) } if cpus else {}
+
+    process = await asyncio.create_subprocess_exec(*genfens_command_builder(args, index),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, limit=GENFENS_LINE_LIMIT, **pinning)
 
     try:
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        found = 0 # Read until the engine exits, but only keep the first N openings
+        while (line := await asyncio.wait_for(process.stdout.readline(), GENFENS_STALL_SECONDS)):
+            if found < args['N'] and line.startswith(b'info string genfens '):
+                on_opening(line.decode('utf-8').split('genfens ')[1].rstrip())
+                found += 1
+
+        await process.wait()
+
+    except asyncio.TimeoutError:
+        raise utils.OpenBenchFailedGenfensException('[%s] Stalled during genfens' % (args['engine'])) from None
 
-        for line in iter(process.stdout.readline, b''):
-            if line.decode('utf-8').startswith('info string genfens '):
-                queue.put(line.decode('utf-8').split('genfens ')[1].rstrip())
+    finally: # Only ever kill our own engine, never others sharing the same binary
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
 
-        process.wait()
+    if found < args['N']:
+        raise utils.OpenBenchFailedGenfensException('[%s] Exited during genfens' % (args['engine']))
 
-    except:
-        raise
+async def genfens_all_engines(args):
+
+    written = 0
+
+    def on_opening(fen):
+        nonlocal written
+        args['output'].write(convert_fen_to_epd(fen) + '\n')
+        written += 1
+        genfens_progress_bar(written, args['N'] * args['threads'])
+
+    # Split the work over many engines. Ensure the seed varies by the engine,
+    # in accordance with how many openings each engine will generate
+
+    tasks = [asyncio.ensure_future(genfens_single_engine(args, index, on_opening))
+        for index in range(args['threads'])]
+
+    try: # The first failure stops, and kills, every other engine
+        await asyncio.gather(*tasks)
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 def genfens_progress_bar(curr, total):
 
@@ -107,34 +168,9 @@ def create_genfens_opening_book(args):
     N          = args['N']
     threads    = args['threads']
     start_time = time.time()
-    output     = multiprocessing.Queue()
 
     print ('\nGenerating %d Openings using %d Threads...' % (N * threads, threads))
 
-    # Split the work over many threads. Ensure the seed varies by the thread,
-    # number in accordance with how many openings each thread will generate
-
-    processes = [
-        multiprocessing.Process(
-            target=genfens_single_threaded,
-            args=(genfens_command_builder(args, index), output))
-        for index in range(threads)
-    ]
-
-    for process in processes:
-        process.start()
-
-    try: # Each process will deposit exactly N results into the Queue
-        for iteration in range(N * threads):
-            args['output'].write(convert_fen_to_epd(output.get(timeout=15)) + '\n')
-            genfens_progress_bar(iteration+1, N * threads)
-
-    except queue.Empty: # Force kill the engine, thus causing the processes to finish
-        utils.kill_process_by_name(args['engine'])
-        raise utils.OpenBenchFailedGenfensException('[%s] Stalled during genfens' % (args['engine']))
-
-    finally: # Join everything to avoid zombie processes
-        for process in processes:
-            process.join()
+    asyncio.run(genfens_all_engines(args))
 
     print('\nFinished Building Opening Book in %.3f seconds' % (time.time() - start_time))
@@ -19,6 +19,7 @@
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 import bz2
+import io
 import re
 import sys
 
@@ -31,13 +32,33 @@ REGEX_MOVE_AND_COMMENT = r'\s*(?:\d+\. )?([a-zA-Z0-9+=#*-]+) (?:\s*\{\s*([^}]*)\
 REGEX_GAME_RESULT      = r'\s*(1-0|0-1|1/2-1/2|\*)'
 
 def pgn_iterator(fname):
+    for header_lines, move_lines in pgn_slice_iterator(fname):
+        yield (pgn_header_list(header_lines), ' '.join(move_lines))
+
+def pgn_slice_iterator(fname):
     with open(fname) as pgn:
-        while True:
-            headers   = pgn_header_list(iter(lambda: pgn.readline().rstrip(), ''))
-            move_list = ' '.join(iter(lambda: pgn.readline().rstrip(), ''))
-            if not headers or not move_list:
-                break
-            yield (headers, move_list)
+        yield from pgn_slice_stream(pgn)
+
+def pgn_slice_stream(pgn):
+    while True:
+        header_lines = list(iter(lambda: pgn.readline().rstrip(), ''))
+        move_lines   = list(iter(lambda: pgn.readline().rstrip(), ''))
+        if not header_lines or not move_lines:
+            break
+        yield (header_lines, move_lines)
+
+def read_completed_games(file_name, offset, final):
+
+    with open(file_name, 'rb') as pgn:
+        pgn.seek(offset)
+        data = pgn.read()
+
+    # The final game may still be mid-write, unless the match runner has exited.
+    # A game is only known to be complete once the following game has started
+    if not final:
+        data = data[:data.rfind(b'\n[Event ') + 1]
+
+    return data.decode('utf-8'), offset + len(data)
 
 def pgn_header_list(lines):
     # PGN Format: [<Header> "<Value>"]
@@ -95,11 +116,40 @@ def strip_entire_pgn(file_name, scale_factor, compact):
 
     return stripped
 
-def compress_list_of_pgns(file_names, scale_factor, compact):
+def pgn_error_reason(headers):
+
+    reason = headers.get('Termination', '')
+
+    if 'abandoned' in reason:
+        return 'Disconnect'
+
+    if 'stalled' in reason:
+        return 'Stalled'
+
+    if 'illegal' in reason:
+        return 'Illegal Move'
+
+def process_runner_pgn(file_name, offset, scale_factor, compact, compress, final=True):
+
+    # Single pass over the completed games in one match runner's PGN, starting
+    # at offset. Collects every game with an error Termination, and optionally
+    # produces the stripped, bz2 text. Returns the offset to resume from later
+
+    text, offset = read_completed_games(file_name, offset, final)
+
+    stripped, errors = '', []
+    for header_lines, move_lines in pgn_slice_stream(io.StringIO(text)):
+
+        header_dict = pgn_header_list(header_lines)
+
+        if (error := pgn_error_reason(header_dict)):
+            errors.append((error, '\n'.join(header_lines + [''] + move_lines)))
 
-    text = ''
-    for fname in file_names:
-        print ('Compressing %s...' % (fname))
-        text += strip_entire_pgn(fname, scale_factor, compact)
+        if compress:
+            header_dict['ScaleFactor'] = str(scale_factor)
+            stripped += pgn_strip_headers(header_dict, compact) + '\n\n'
+            stripped += pgn_strip_movelist(' '.join(move_lines), compact) + '\n\n'
 
-    return bz2.compress(text.encode())
+    # bz2 streams may be concatenated, so each runner compresses its own
+    compressed = bz2.compress(stripped.encode()) if compress and stripped else b''
+    return compressed, errors, offset
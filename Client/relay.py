@@ -0,0 +1,238 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                                                                           #
+#   OpenBench is a chess engine testing framework by Andrew Grant.          #
+#   <https://github.com/AndyGrant/OpenBench>  <andrew@grantnet.us>          #
+#                                                                           #
+#   OpenBench is free software: you can redistribute it and/or modify       #
+#   it under the terms of the GNU General Public License as published by    #
+#   the Free Software Foundation, either version 3 of the License, or       #
+#   (at your option) any later version.                                     #
+#                                                                           #
+#   OpenBench is distributed in the hope that it will be useful,            #
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#   GNU General Public License for more details.                            #
+#                                                                           #
+#   You should have received a copy of the GNU General Public License       #
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.   #
+#                                                                           #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# The sole purpose of this module is to invoke run_relay(), via client.py --relay.
+#
+# A relay is a small caching HTTP proxy for the artifacts that every worker at a
+# site would otherwise fetch for themselves: Books, Networks, engine sources, and
+# match runner sources. Workers started with --via-relay send those requests to
+# the relay, naming the real URL in X-Relay-Target. Each artifact then crosses
+# the WAN once per site, and concurrent requests for it share a single fetch.
+#
+# Responses are cached by method, target, Accept-Encoding, and a hash of the body,
+# which carries the credentials. A copy is therefore only ever served to a Worker
+# presenting the same credentials that fetched it. Only successful responses that
+# are not JSON are cached, since the server reports errors, like bad credentials,
+# as JSON. Targets are limited to the OpenBench server, and to GitHub.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+## Local imports must only use "import x", never "from x import ..."
+
+import utils
+
+RELAY_CACHE   = 'RelayCache' # Default folder for cached responses
+RELAY_BUDGET  = 16384        # Default MB of disk that cached responses may use
+RELAY_TIMEOUT = 60           # Seconds to wait on the upstream server, between bytes
+RELAY_LOCKS   = 64           # Keys are spread over this many locks, never freed
+
+# Hosts, besides the OpenBench server, that artifacts may be fetched from
+ARTIFACT_HOSTS = ('github.com', 'codeload.github.com', 'raw.githubusercontent.com', 'objects.githubusercontent.com')
+
+# Only these headers are passed along, in either direction
+FORWARD_REQUEST_HEADERS  = ('Content-Type', 'Accept-Encoding', 'Range')
+FORWARD_RESPONSE_HEADERS = ('Content-Type', 'Content-Encoding', 'ETag')
+
+class RelayCache(object):
+
+    ## Holds each cached response as <key> and <key>.json, the latter holding the
+    ## headers and fetch time. Locking the key makes concurrent misses fetch just once
+
+    def __init__(self, cache_dir, budget):
+        self.cache_dir = cache_dir
+        self.budget    = budget
+        self.locks     = [threading.Lock() for x in range(RELAY_LOCKS)]
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_lock(self, key):
+
+        # Striped, so that memory stays fixed. Unrelated keys rarely share a lock,
+        # and when they do, one fetch merely waits on the other
+        return self.locks[int(key[:8], 16) % RELAY_LOCKS]
+
+    def lookup(self, key, max_age):
+
+        try:
+            with open(os.path.join(self.cache_dir, key + '.json')) as fin:
+                meta = json.load(fin)
+
+            if time.time() - meta['time'] <= max_age and os.path.isfile(os.path.join(self.cache_dir, key)):
+                os.utime(os.path.join(self.cache_dir, key))
+                return meta
+
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, key, response):
+
+        # Write to a temp file first, so readers only ever see complete responses.
+        # Bytes are kept as sent, so that they still match any Content-Encoding
+        path = os.path.join(self.cache_dir, key)
+        with open(path + '.tmp', 'wb') as fout:
+            for chunk in response.raw.stream(utils.STREAM_CHUNK_SIZE, decode_content=False):
+                fout.write(chunk)
+
+        headers = { k : response.headers[k] for k in FORWARD_RESPONSE_HEADERS if k in response.headers }
+        with open(path + '.json.tmp', 'w') as fout:
+            json.dump({ 'headers' : headers, 'time' : time.time() }, fout)
+
+        os.replace(path + '.tmp', path)
+        os.replace(path + '.json.tmp', path + '.json')
+
+        self.evict()
+        return self.lookup(key, float('inf'))
+
+    def evict(self):
+
+        # Least recently served responses go first, once over budget
+        entries = [os.path.join(self.cache_dir, x) for x in os.listdir(self.cache_dir) if re.fullmatch(r'[0-9a-f]{64}', x)]
+        entries = sorted(entries, key=os.path.getmtime)
+        total   = sum(map(os.path.getsize, entries))
+
+        while entries and total > self.budget:
+            path = entries.pop(0); total -= os.path.getsize(path)
+            for file in (path, path + '.json'):
+                try: os.remove(file)
+                except OSError: pass
+
+class RelayHandler(BaseHTTPRequestHandler):
+
+    protocol_version        = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    cache                   = None # Set by run_relay()
+    upstream                = None # Set by run_relay(), as (scheme, netloc)
+
+    def log_message(self, format, *args):
+        print ('[Relay] %s' % (format % args))
+
+    def do_GET(self):
+        self.relay()
+
+    def do_POST(self):
+        self.relay()
+
+    def relay(self):
+
+        length  = int(self.headers.get('Content-Length', 0))
+        body    = self.rfile.read(length) if length else None
+        target  = self.headers.get('X-Relay-Target')
+        max_age = int(self.headers.get('X-Relay-Max-Age', 0))
+
+        if not target or self.path.rstrip('/') != '/relay':
+            return self.reply_error(400, 'Expected a request to /relay with X-Relay-Target')
+
+        if not RelayHandler.allowed_target(target):
+            return self.reply_error(403, 'Relay does not fetch from %s' % (target))
+
+        headers = { k : self.headers[k] for k in FORWARD_REQUEST_HEADERS if k in self.headers }
+        fields  = [self.command, target, self.headers.get('Accept-Encoding', ''), hashlib.sha256(body or b'').hexdigest()]
+        key     = hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+        # Cached copies can answer open-ended Ranges, as used to resume downloads
+        byte_range = re.fullmatch(r'bytes=(\d+)-', headers.pop('Range', '').strip())
+
+        with RelayHandler.cache.key_lock(key):
+
+            if not (meta := RelayHandler.cache.lookup(key, max_age)):
+
+                # Fetch, and cache only complete and successful responses
+                response = utils.http_request(self.command, target, data=body, headers=headers,
+                    timeout=RELAY_TIMEOUT, idempotent=True, stream=True)
+
+                # Errors are passed along, but never cached
+                content_type = response.headers.get('Content-Type', '')
+                if response.status_code != 200 or content_type.startswith('application/json'):
+                    return self.reply_uncached(response)
+
+                meta = RelayHandler.cache.store(key, response)
+
+        self.reply_cached(key, meta, int(byte_range.group(1)) if byte_range else 0)
+
+    @staticmethod
+    def allowed_target(target):
+
+        parts = urllib.parse.urlsplit(target)
+        if (parts.scheme, parts.netloc) == RelayHandler.upstream:
+            return True
+
+        return parts.scheme == 'https' and parts.hostname in ARTIFACT_HOSTS
+
+    def reply_uncached(self, response):
+
+        # Bytes are kept as sent, so that they still match any Content-Encoding
+        content = response.raw.read(decode_content=False)
+
+        self.send_response(response.status_code)
+        for header in FORWARD_RESPONSE_HEADERS:
+            if header in response.headers:
+                self.send_header(header, response.headers[header])
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def reply_cached(self, key, meta, start):
+
+        path = os.path.join(RelayHandler.cache.cache_dir, key)
+        size = os.path.getsize(path)
+
+        if start and start >= size:
+            return self.reply_error(416, b'')
+
+        self.send_response(206 if start else 200)
+        for header, value in meta['headers'].items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(size - start))
+        if start: self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, size - 1, size))
+        self.end_headers()
+
+        with open(path, 'rb') as fin:
+            fin.seek(start)
+            while (chunk := fin.read(utils.STREAM_CHUNK_SIZE)):
+                self.wfile.write(chunk)
+
+    def reply_error(self, status, content):
+
+        content = content.encode() if isinstance(content, str) else content
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+def run_relay(address, server, cache_dir=RELAY_CACHE, budget_mb=RELAY_BUDGET):
+
+    # Only reachable from this machine, unless a host to bind to is given
+    host, port = address.rsplit(':', 1) if ':' in address else ('127.0.0.1', address)
+
+    parts = urllib.parse.urlsplit(server)
+    RelayHandler.upstream = (parts.scheme, parts.netloc)
+    RelayHandler.cache    = RelayCache(os.path.abspath(cache_dir), int(budget_mb) * 1024 * 1024)
+    server = ThreadingHTTPServer((host, int(port)), RelayHandler)
+
+    print ('[Relay] Serving on %s:%d, caching into %s' % (host, server.server_address[1], RelayHandler.cache.cache_dir))
+    server.serve_forever()
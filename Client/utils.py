@@ -19,20 +19,43 @@
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 import argparse
+import gzip
 import hashlib
+import json
 import os
 import platform
 import requests
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import zipfile
 
+try: # Some Python builds lack liblzma, in which case Networks are fetched uncompressed
+    import lzma
+except ImportError:
+    lzma = None
+
 ## Local imports must only use "import x", never "from x import ..."
 
 IS_WINDOWS = platform.system() == 'Windows' # Don't touch this
 IS_LINUX   = platform.system() != 'Windows' # Don't touch this
 
+HTTP_RETRIES      = 4         # Attempts after the first, for idempotent requests
+HTTP_BACKOFF      = 1.0       # Seconds before the first retry, doubling each time
+HTTP_GZIP_MINIMUM = 16 * 1024 # Request bodies at least this large are gzipped
+HTTP_POOL_SIZE    = 32        # Keep-alive connections held open per host
+
+HTTP_SESSION      = None      # Shared by the entire worker, via http_session()
+HTTP_SESSION_LOCK = threading.Lock()
+HTTP_RELAY        = None      # URL of a site-local caching relay, set via --via-relay
+
+STREAM_CHUNK_SIZE = 1024 * 1024 # Bytes per read while streaming or hashing downloads
+
+RELAY_IMMUTABLE = 30 * 24 * 60 * 60 # Relay max-age for artifacts named by their contents
+RELAY_MUTABLE   = 60 * 60           # Relay max-age for artifacts named by a branch or tag
+
 
 class OpenBenchFatalWorkerException(Exception):
     def __init__(self, message):
@@ -91,6 +114,39 @@ class OpenBenchMatchRunnerBuildFailedException(Exception):
         self.message = ''
         super().__init__(self.message)
 
+class HostFileLock(object):
+
+    ## Exclusive lock on a file, which is respected by every process on the host. The
+    ## lock is held by the open file itself, so it is released even if we are killed
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+
+        self.file = open(self.path, 'a')
+
+        if IS_LINUX:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+        if IS_WINDOWS: # LK_LOCK only retries for ~10 seconds
+            import msvcrt
+            while True:
+                try: self.file.seek(0); msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1); break
+                except OSError: pass
+
+        return self
+
+    def __exit__(self, *args):
+
+        if IS_WINDOWS:
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+
+        self.file.close()
+
 def kill_process_by_name(process_name):
 
     process_name = os.path.basename(process_name)
@@ -106,6 +162,127 @@ def url_join(*args, trailing_slash=True):
     # Join a set of URL paths while maintaining the correct format
     return '/'.join([f.lstrip('/').rstrip('/') for f in args]) + ['', '/'][trailing_slash]
 
+def cpu_topology():
+
+    # Returns a list of cache domains (an L3 slice, like a CCX, or else a whole socket),
+    # each being a list of physical cores, each being a list of logical CPUs. Only CPUs
+    # we are permitted to run on are included. None when the OS does not support pinning
+
+    if not IS_LINUX or not hasattr(os, 'sched_setaffinity'):
+        return None
+
+    def read(cpu, path, default):
+        try:
+            with open('/sys/devices/system/cpu/cpu%d/%s' % (cpu, path)) as fin:
+                return fin.read().strip()
+        except OSError:
+            return default
+
+    domains = {} # Key: (Package, L3 CPUs), Value: { Core Id : [CPUs] }
+    for cpu in sorted(os.sched_getaffinity(0)):
+        package = int(read(cpu, 'topology/physical_package_id', 0))
+        core    = int(read(cpu, 'topology/core_id', cpu))
+        l3      = read(cpu, 'cache/index3/shared_cpu_list', '')
+        domains.setdefault((package, l3), {}).setdefault(core, []).append(cpu)
+
+    return [[cores[core] for core in sorted(cores, key=lambda x: cores[x][0])]
+        for key, cores in sorted(domains.items(), key=lambda x: min(min(x[1].values())))]
+
+def partition_cpus(topology, parts, per_part=1):
+
+    # Split the topology into equally sized, disjoint CPU sets, never splitting a
+    # physical core. Whole cache domains are handed out when they divide evenly, and
+    # give each set at least per_part cores. Otherwise cores are handed out, with any
+    # remainder left unused, so that no set is larger than the others
+
+    if not topology or parts < 1:
+        return None
+
+    if len(topology) % parts == 0:
+        count  = len(topology) // parts
+        chunks = [topology[ii * count : (ii+1) * count] for ii in range(parts)]
+        sizes  = set(sum(len(domain) for domain in chunk) for chunk in chunks)
+        if len(sizes) == 1 and sizes.pop() >= per_part:
+            return [set(cpu for domain in chunk for core in domain for cpu in core) for chunk in chunks]
+
+    cores = [core for domain in topology for core in domain]
+    size  = len(cores) // parts
+    if size < 1:
+        return None
+
+    chunks = [cores[ii * size : (ii+1) * size] for ii in range(parts)]
+    return [set(cpu for core in chunk for cpu in core) for chunk in chunks]
+
+def http_session():
+
+    # One pooled, keep-alive session, shared by every thread in the worker
+    global HTTP_SESSION
+
+    with HTTP_SESSION_LOCK:
+        if HTTP_SESSION is None:
+            adapter      = requests.adapters.HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE)
+            HTTP_SESSION = requests.Session()
+            HTTP_SESSION.mount('http://', adapter)
+            HTTP_SESSION.mount('https://', adapter)
+
+    return HTTP_SESSION
+
+def http_request(method, url, idempotent=False, compress=False, relay=None, **kwargs):
+
+    # Only idempotent requests may be retried, with an exponential backoff.
+    # Large bodies may be gzipped, for endpoints that are known to accept it.
+    # Artifacts may go via HTTP_RELAY, if set, where relay is the maximum age
+    # in seconds of a copy that the relay may answer with, instead of fetching
+
+    timeout  = kwargs.pop('timeout', None)
+    stream   = kwargs.pop('stream', False)
+    session  = http_session()
+    prepared = session.prepare_request(requests.Request(method, url, **kwargs))
+
+    # Honour REQUESTS_CA_BUNDLE, proxies, and the like, as requests.post() would
+    settings = session.merge_environment_settings(prepared.url, {}, stream, None, None)
+
+    if relay is not None and HTTP_RELAY:
+        try: return relay_request(session, prepared, relay, timeout, stream)
+        except requests.ConnectionError: print ('Relay unreachable, fetching directly')
+
+    if compress and prepared.body and len(prepared.body) >= HTTP_GZIP_MINIMUM:
+        body = prepared.body.encode() if isinstance(prepared.body, str) else prepared.body
+        body = gzip.compress(body, compresslevel=6)
+
+        # Already compressed content, like .pgn.bz2 files, is not worth it
+        if len(body) < len(prepared.body):
+            prepared.body = body
+            prepared.headers['Content-Encoding'] = 'gzip'
+            prepared.headers['Content-Length'  ] = str(len(body))
+
+    for attempt in range(1 + HTTP_RETRIES * idempotent):
+
+        try:
+            response = session.send(prepared, timeout=timeout, **settings)
+            if not idempotent or response.status_code not in (502, 503, 504) or attempt == HTTP_RETRIES:
+                return response
+
+            # Return the connection to the pool, as a streamed body is never read
+            response.close()
+
+        except (requests.ConnectionError, requests.Timeout):
+            if not idempotent or attempt == HTTP_RETRIES:
+                raise
+
+        time.sleep(HTTP_BACKOFF * 2 ** attempt)
+
+def relay_request(session, prepared, max_age, timeout, stream):
+
+    # The relay repeats the request to X-Relay-Target, unless it has a fresh enough copy
+    relayed = prepared.copy()
+    relayed.headers['X-Relay-Target' ] = prepared.url
+    relayed.headers['X-Relay-Max-Age'] = str(int(max_age))
+    relayed.prepare_url(url_join(HTTP_RELAY, 'relay', trailing_slash=False), None)
+
+    settings = session.merge_environment_settings(relayed.url, {}, stream, None, None)
+    return session.send(relayed, timeout=timeout, **settings)
+
 def credentialed_cmdline_args(parser=None):
 
     # Adds username, password, and server to the ArgumentParser
@@ -138,12 +315,12 @@ def credentialed_cmdline_args(parser=None):
 
     return args
 
-def credentialed_request(server, username, password, endpoint):
+def credentialed_request(server, username, password, endpoint, **kwargs):
 
     target  = url_join(server, *endpoint.split('/'))
     payload = { 'username' : username, 'password' : password }
 
-    return requests.post(data=payload, url=target)
+    return http_request('POST', target, data=payload, idempotent=True, **kwargs)
 
 def read_git_credentials(engine):
     fname = 'credentials.%s' % (engine.replace(' ', '').lower())
@@ -177,15 +354,15 @@ def check_for_engine_binary(out_path):
         os.rename(out_path, '%s.exe' % (out_path))
         return '%s.exe' % (out_path)
 
-def makefile_command(net_path, make_path, out_path, compiler):
+def makefile_command(net_path, make_path, out_path, compiler, jobs=None, ccache=False):
 
-    # Build with -j, and EXE= to contol the output location
-    command = ['make', '-j', 'EXE=%s' % (out_path)]
+    # Build with -j, limited when sharing the CPU, and EXE= to contol the output location
+    command = ['make', '-j%d' % (jobs) if jobs else '-j', 'EXE=%s' % (out_path)]
 
-    # Build with CC/CXX= when using a custom compiler
+    # Build with CC/CXX= when using a custom compiler, possibly via ccache
     if compiler:
         comp_flag = ['CC', 'CXX']['++' in compiler]
-        command  += ['%s=%s' % (comp_flag, compiler)]
+        command  += ['%s=%s%s' % (comp_flag, 'ccache ' if ccache else '', compiler)]
 
     # Build with EVALFILE= to embed NNUE files
     if net_path:
@@ -193,6 +370,30 @@ def makefile_command(net_path, make_path, out_path, compiler):
 
     return command
 
+def build_cache_key(engine, commit_sha, make_path, compiler, compiler_ver, net_path, cpu_flags):
+
+    # Everything that can change the binary produced by building an engine
+    net_sha = os.path.basename(net_path) if net_path else None
+    fields  = [engine, commit_sha.upper(), make_path, compiler, compiler_ver, net_sha, sorted(cpu_flags)]
+
+    return '%s-%s' % (engine, hashlib.sha256(json.dumps(fields).encode()).hexdigest()[:32])
+
+def prune_build_cache(cache_dir, max_age):
+
+    if not os.path.isdir(cache_dir):
+        return
+
+    # Binaries are touched on every use, so only long unused ones are removed
+    for file in os.listdir(cache_dir):
+
+        path = os.path.join(cache_dir, file)
+        if file.endswith('.lock') or time.time() - os.path.getmtime(path) < max_age:
+            continue
+
+        with HostFileLock('%s.lock' % (path[:-4] if path.endswith('.exe') else path)):
+            try: os.remove(path)
+            except OSError: pass
+
 def select_best_artifact(options, cpu_name, cpu_flags):
 
     # Step 1. Filter down to our operating system only
@@ -247,78 +448,197 @@ def download_opening_book(book_sha, book_source, book_name):
     if book_name.upper() == 'NONE':
         return
 
-    # Book might already have been downloaded
-    if not os.path.exists(book_path):
+    # Other Workers sharing this directory may be fetching the same Book
+    with HostFileLock('%s.lock' % (book_path)):
+
+        # Book might already have been downloaded
+        if not os.path.exists(book_path):
+            print ('Fetching Opening Book [%s]' % (book_name))
+            fetch_opening_book(book_source, book_path)
+
+        # Only hash the Book if it changed since it was last verified
+        if not (sha256 := verified_book_sha(book_path)):
+            sha256 = book_sha256(book_path)
+
+        # Log SHAs on every workload
+        print ('Correct  %s' % (book_sha.upper()))
+        print ('Download %s\n' % (sha256.upper()))
+
+        # We have to have the correct SHA to continue
+        if book_sha.upper() != sha256.upper():
+            for path in (book_path, '%s.verified' % (book_path)):
+                if os.path.isfile(path): os.remove(path)
+            raise OpenBenchCorruptedBookException('Invalid sha for %s' % (book_name))
+
+        record_verified_book(book_path, sha256)
+
+def fetch_opening_book(book_source, book_path):
 
-        print ('Fetching Opening Book [%s]' % (book_name))
+    # Work with temp files in Books/ until finished, so the final move is atomic
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(book_path)) as temp_dir:
 
-        # Work with temp files and directories until finished extracting
-        with tempfile.TemporaryDirectory() as temp_dir:
+        # Stream the zip file from Github to disk
+        zip_path = os.path.join(temp_dir, 'book.zip')
+        response = http_request('GET', book_source, idempotent=True, stream=True, relay=RELAY_IMMUTABLE)
+        with open(zip_path, 'wb') as fout:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                fout.write(chunk)
 
-            # Download the zip file from Github
-            zip_path = os.path.join(temp_dir, '%s.zip' % (book_name))
-            with open(zip_path, 'wb') as zip_file:
-                zip_file.write(requests.get(book_source).content)
+        # Stream the sole file out of the archive, never holding it in memory
+        out_path = os.path.join(temp_dir, 'book')
+        with zipfile.ZipFile(zip_path, 'r') as zip_file:
+            member = next(x for x in zip_file.infolist() if not x.is_dir())
+            with zip_file.open(member) as fin, open(out_path, 'wb') as fout:
+                shutil.copyfileobj(fin, fout, STREAM_CHUNK_SIZE)
 
-            # Unzip the book to a directory
-            unzip_path = os.path.join(temp_dir, book_name)
-            with zipfile.ZipFile(zip_path, 'r') as zip_file:
-                zip_file.extractall(unzip_path)
+        os.replace(out_path, book_path)
 
-            # Rename the sole binary
-            unzip_root = os.path.join(unzip_path, os.listdir(unzip_path)[0])
-            shutil.move(unzip_root, book_path)
+def book_sha256(book_path):
 
-    # Verify SHAs match with the server
+    # Hashed as text, as it always has been, so line endings are normalised
+    hasher = hashlib.sha256()
     with open(book_path) as fin:
-        content = fin.read().encode('utf-8')
-        sha256  = hashlib.sha256(content).hexdigest()
+        while (chunk := fin.read(STREAM_CHUNK_SIZE)):
+            hasher.update(chunk.encode('utf-8'))
+
+    return hasher.hexdigest()
+
+def book_file_identity(book_path):
+    stat = os.stat(book_path)
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+def verified_book_sha(book_path):
+
+    # The sha256 recorded at the last verification, if the file is untouched since
+    try:
+        with open('%s.verified' % (book_path)) as fin:
+            record = json.load(fin)
+
+        if record['identity'] == book_file_identity(book_path):
+            return record['sha256']
+
+    except (OSError, ValueError, KeyError):
+        return None
 
-    # Log SHAs on every workload
-    print ('Correct  %s' % (book_sha.upper()))
-    print ('Download %s\n' % (sha256.upper()))
+def record_verified_book(book_path, sha256):
 
-    # We have to have the correct SHA to continue
-    if book_sha.upper() != sha256.upper():
-        os.remove(book_path)
-        raise OpenBenchCorruptedBookException('Invalid sha for %s' % (book_name))
+    record = { 'identity' : book_file_identity(book_path), 'sha256' : sha256 }
+
+    with open('%s.verified.tmp' % (book_path), 'w') as fout:
+        json.dump(record, fout)
+    os.replace('%s.verified.tmp' % (book_path), '%s.verified' % (book_path))
 
 def download_network(server, username, password, engine, net_name, net_sha, net_path):
 
-    # Avoid redownloading Network files
-    if not os.path.isfile(net_path):
+    # Other Workers sharing this directory may be fetching the same Network
+    with HostFileLock('%s.lock' % (net_path)):
+
+        # Avoid redownloading Network files
+        if (fetching := not os.path.isfile(net_path)):
+            print ('Fetching %s (%s) for %s' % (net_name, net_sha, engine))
+            sha256 = stream_network(server, username, password, engine, net_sha, net_path)
+
+        else: # Check existing files, in case they were corrupted on disk
+            print ('Found %s (%s) for %s' % (net_name, net_sha, engine))
+            sha256 = file_sha256(net_path)
+
+        # Check for the first 8 characters of the sha256
+        print ('Verifying %s (%s) for %s\n' % (net_name, net_sha, engine))
+
+        # Verify the download and delete corrupted ones
+        if net_sha.upper() != sha256[:8].upper():
+            for path in (net_path, '%s.partial' % (net_path)):
+                if os.path.isfile(path): os.remove(path)
+            raise OpenBenchCorruptedNetworkException('Invalid SHA for %s' % (net_name))
+
+        # Only a verified download is ever moved into place
+        if fetching:
+            os.replace('%s.partial' % (net_path), net_path)
+
+def stream_network(server, username, password, engine, net_sha, net_path):
+
+    # Downloads into net_path.partial, hashing along the way, and resuming with
+    # a Range request after any interruption, including one in an earlier session.
+    # Fresh downloads ask for the xz variant, which is inflated while streaming, so
+    # that the partial file always holds a prefix of the plain Network to resume from
+
+    endpoint = 'api/networks/%s/%s' % (engine, net_sha)
+    partial  = '%s.partial' % (net_path)
+
+    for attempt in range(1 + HTTP_RETRIES):
+
+        # Pick up the hash from wherever the last attempt stopped
+        offset  = os.path.getsize(partial) if os.path.isfile(partial) else 0
+        hasher  = file_sha256(partial, hexdigest=False) if offset else hashlib.sha256()
+        headers = { 'Range' : 'bytes=%d-' % (offset) } if offset else { 'Accept-Encoding' : 'xz' } if lzma else {}
+
+        try:
+            response = credentialed_request(server, username, password, endpoint,
+                headers=headers, stream=True, relay=RELAY_IMMUTABLE)
+
+            # The partial file was complete already, or is no longer valid
+            if response.status_code == 416:
+                os.remove(partial)
+                continue
+
+            # Servers without Range support send everything again
+            if response.status_code != 206:
+                hasher, offset = hashlib.sha256(), 0
 
-        # Format the API request, including credentials
-        print ('Fetching %s (%s) for %s' % (net_name, net_sha, engine))
-        endpoint = 'api/networks/%s/%s' % (engine, net_sha)
-        request  = credentialed_request(server, username, password, endpoint)
+            # Compressed variants are verified against the sha256 of the plain Network
+            inflate = lzma.LZMADecompressor() if response.headers.get('Content-Encoding') == 'xz' else None
 
-        # Write the content out to the net_path in kb chunks
-        with open(net_path, 'wb') as fout:
-            for chunk in request.iter_content(chunk_size=1024):
-                if chunk: fout.write(chunk)
-            fout.flush()
+            with open(partial, 'ab' if offset else 'wb') as fout:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    chunk = inflate.decompress(chunk) if inflate else chunk
+                    hasher.update(chunk)
+                    fout.write(chunk)
 
-    else:
-        print ('Found %s (%s) for %s' % (net_name, net_sha, engine))
+            return hasher.hexdigest()
 
-    # Check for the first 8 characters of the sha256
-    print ('Verifying %s (%s) for %s\n' % (net_name, net_sha, engine))
-    with open(net_path, 'rb') as network:
-        sha256 = hashlib.sha256(network.read()).hexdigest()[:8]
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            if attempt == HTTP_RETRIES: raise
+            print ('Download interrupted, resuming from %d bytes' % (os.path.getsize(partial)))
+            time.sleep(HTTP_BACKOFF * 2 ** attempt)
 
-    # Verify the download and delete partial or corrupted ones
-    if net_sha.upper() != sha256.upper():
-        os.remove(net_path)
-        raise OpenBenchCorruptedNetworkException('Invalid SHA for %s' % (net_name))
+def file_sha256(path, hexdigest=True):
 
-def download_public_engine(engine, net_path, branch, source, make_path, out_path, compiler=None):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        while (chunk := fin.read(STREAM_CHUNK_SIZE)):
+            hasher.update(chunk)
+
+    return hasher.hexdigest() if hexdigest else hasher
+
+def download_public_engine(engine, net_path, branch, source, make_path, out_path, compiler=None, jobs=None, cache_path=None, ccache=False):
 
     # Check to see if we already have the binary
     if check_for_engine_binary(out_path):
         print('Found [%s-%s]' % (engine, branch))
         return os.path.basename(check_for_engine_binary(out_path))
 
+    if not cache_path:
+        return build_public_engine(engine, net_path, branch, source, make_path, out_path, compiler, jobs, ccache)
+
+    # Other workers on this host may be building, or have built, the very same binary
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with HostFileLock('%s.lock' % (cache_path)):
+
+        if check_for_engine_binary(cache_path):
+            print('Found [%s-%s] in the build cache' % (engine, branch))
+
+        else: # Build directly into the cache, to be copied out below
+            build_public_engine(engine, net_path, branch, source, make_path, cache_path, compiler, jobs, ccache)
+
+        # Mark as recently used, and copy, keeping permissions, and any .exe extension
+        cached = check_for_engine_binary(cache_path)
+        os.utime(cached)
+        shutil.copy2(cached, out_path + cached[len(cache_path):])
+
+    return os.path.basename(check_for_engine_binary(out_path))
+
+def build_public_engine(engine, net_path, branch, source, make_path, out_path, compiler=None, jobs=None, ccache=False):
+
     # Work with temp files and directories until finished building
     with tempfile.TemporaryDirectory() as temp_dir:
 
@@ -327,7 +647,7 @@ def download_public_engine(engine, net_path, branch, source, make_path, out_path
         # Download the zip file from Github
         zip_path = os.path.join(temp_dir, '%s-tmp' % (engine))
         with open(zip_path, 'wb') as zip_file:
-            zip_file.write(requests.get(source).content)
+            zip_file.write(http_request('GET', source, idempotent=True, relay=RELAY_IMMUTABLE).content)
 
         # Unzip the engine to a directory called <engine>
         unzip_path = os.path.join(temp_dir, engine)
@@ -342,10 +662,13 @@ def download_public_engine(engine, net_path, branch, source, make_path, out_path
         # Prepare the MAKEFILE command
         make_path = os.path.join(src_path, make_path)
         bin_path  = os.path.join(make_path, os.path.basename(out_path))
-        make_cmd  = makefile_command(net_path, make_path, os.path.basename(out_path), compiler)
+        make_cmd  = makefile_command(net_path, make_path, os.path.basename(out_path), compiler, jobs, ccache)
+
+        # ccache must ignore the temporary directory, which differs for every build
+        env = dict(os.environ, CCACHE_BASEDIR=src_path, CCACHE_NOHASHDIR='1') if ccache else None
 
         # Build the engine, which will produce a binary to bin_path, to be moved after
-        process     = subprocess.Popen(make_cmd, cwd=make_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        process     = subprocess.Popen(make_cmd, cwd=make_path, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
         comp_output = process.communicate()[0].decode('utf-8')
 
         # Verify that the compilation subprocess did not exit with errors
@@ -365,6 +688,71 @@ def download_public_engine(engine, net_path, branch, source, make_path, out_path
     message = 'Error during compilation. The logs have been sent to the server'
     raise OpenBenchBuildFailedException(message, comp_output)
 
+def shared_binary_fields(engine, commit_sha, net_path, compiler, compiler_ver, cpu_flags):
+
+    # Workers must match on all of these, in order to share a binary
+    return {
+        'engine'   : engine,
+        'sha'      : commit_sha.upper(),
+        'network'  : os.path.basename(net_path) if net_path else '',
+        'compiler' : '%s %s' % (compiler, compiler_ver),
+        'tier'     : ' '.join(sorted(cpu_flags)),
+        'os_name'  : platform.system(),
+    }
+
+def download_shared_binary(server, credentials, fields, out_path):
+
+    # Returns True, only if a verified binary built by another Worker is now at out_path
+
+    target = url_join(server, 'clientFindBinary')
+    found  = http_request('POST', target, data={ **credentials, **fields }, timeout=30, idempotent=True).json()
+
+    if 'sha256' not in found:
+        return False
+
+    print ('Fetching shared binary [%s-%s] (%s)' % (fields['engine'], fields['sha'][:8], found['sha256'][:8]))
+
+    target   = url_join(server, 'clientGetBinary')
+    payload  = { **credentials, 'sha256' : found['sha256'] }
+    response = http_request('POST', target, data=payload, timeout=30, idempotent=True, stream=True)
+
+    if response.status_code != 200 or 'json' in response.headers.get('Content-Type', ''):
+        return False
+
+    # Hash while writing to a temporary file, which is only moved into place once verified
+    hasher   = hashlib.sha256()
+    out_path = out_path + ('.exe' if IS_WINDOWS else '')
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(out_path) or '.', delete=False) as fout:
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            hasher.update(chunk)
+            fout.write(chunk)
+
+    if hasher.hexdigest() != found['sha256']:
+        os.remove(fout.name)
+        print ('Shared binary failed verification (%s)' % (hasher.hexdigest()[:8]))
+        return False
+
+    os.chmod(fout.name, 0o755)
+    os.replace(fout.name, out_path)
+    return True
+
+def upload_shared_binary(server, credentials, fields, binary_path):
+
+    target = url_join(server, 'clientSubmitBinary')
+    with open(binary_path, 'rb') as fin:
+        files = { 'binary' : (os.path.basename(binary_path), fin, 'application/octet-stream') }
+        return http_request('POST', target, data={ **credentials, **fields }, files=files, timeout=120)
+
+def engine_speaks_uci(binary, timeout=10):
+
+    # Cheap sanity check for binaries built elsewhere, before trusting them with a bench
+    try:
+        process = subprocess.run([binary], input=b'uci\nquit\n', capture_output=True, timeout=timeout)
+        return b'uciok' in process.stdout
+
+    except (OSError, subprocess.SubprocessError):
+        return False
+
 def download_private_engine(engine, branch, source, out_path, cpu_name, cpu_flags):
 
     # Check to see if we already have the binary
@@ -374,7 +762,7 @@ def download_private_engine(engine, branch, source, out_path, cpu_name, cpu_flag
 
     # Pick the best artifact to match this machine
     headers   = read_git_credentials(engine)
-    artifacts = requests.get(url=source, headers=headers).json()['artifacts']
+    artifacts = http_request('GET', source, headers=headers, idempotent=True).json()['artifacts']
     options   = { artifact['name'] : artifact for artifact in artifacts }
     best      = select_best_artifact(options, cpu_name, cpu_flags)
 
@@ -386,7 +774,7 @@ def download_private_engine(engine, branch, source, out_path, cpu_name, cpu_flag
         # Download the zip file from Github
         zip_path = os.path.join(temp_dir, '%s-tmp' % (engine))
         with open(zip_path, 'wb') as zip_file:
-            zip_file.write(requests.get(best['archive_download_url'], headers=headers).content)
+            zip_file.write(http_request('GET', best['archive_download_url'], headers=headers, idempotent=True).content)
 
         # Unzip the engine to a directory called <engine>
         unzip_path = os.path.join(temp_dir, engine)
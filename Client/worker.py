@@ -19,16 +19,15 @@
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 import argparse
+import contextlib
 import cpuinfo
+import hashlib
 import importlib
 import json
-import multiprocessing
 import os
 import platform
 import psutil
-import queue
 import re
-import requests
 import shutil
 import subprocess
 import sys
@@ -41,7 +40,8 @@ import zipfile
 
 from subprocess import PIPE, Popen, call, STDOUT
 from itertools import combinations_with_replacement
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
 
 ## Local imports must only use "import x", never "from x import ..."
 ## Local imports must also be done in reload_local_imports()
@@ -59,15 +59,38 @@ from client import try_forever
 
 ## Basic configuration of the Client. These timeouts can be changed at will
 
-CLIENT_VERSION   = 39 # Client version to send to the Server
+CLIENT_VERSION   = 44 # Client version to send to the Server
 TIMEOUT_HTTP     = 30 # Timeout in seconds for HTTP requests
 TIMEOUT_ERROR    = 10 # Timeout in seconds when any errors are thrown
 TIMEOUT_WORKLOAD = 30 # Timeout in seconds between workload requests
-REPORT_INTERVAL  = 30 # Seconds between reports to the Server
+TIMEOUT_EXITFILE = 5  # Timeout in seconds between checks for openbench.exit
+REPORT_INTERVAL  = 30 # Seconds between reports to the Server, unless told otherwise
+PGN_INTERVAL     = 120 # Seconds between uploads of finished PGNs
+
+RESULTS_BATCH_VERSION = 2 # Format of clientSubmitResultsBatch, must match the Server
+RESULTS_JOURNAL       = 'openbench.journal' # Results batches, until the Server has them
+
+# Server errors about the Worker itself, rather than about a particular request
+WORKER_ERRORS = ('Bad Machine Id', 'Invalid Secret Token', 'Server Configuration Changed', 'Bad Credentials')
+
+BENCH_CACHE       = 'bench.cache.json' # Recent bench results, for binaries we've already run
+BENCH_CACHE_TTL   = 6 * 60 * 60       # Seconds before a cached bench must be re-run
+BENCH_DRIFT_LIMIT = 0.05              # Relative change in spot check speed, before re-running
+BENCH_SPOT_NODES  = 2000000           # Nodes searched by the single-core spot check of a cached bench
+BENCH_CI_LIMIT    = 0.02              # Relative 95% confidence, before re-running multi-sample benches
+BENCH_MAX_ROUNDS  = 3                 # Rounds of multi-sample benches, before accepting the noise
+
+ARTIFACT_INDEX  = 'openbench.cache.json' # Size, last use, and pins of everything in ARTIFACT_FOLDERS
+ARTIFACT_BUDGET = 8192                   # Default MB of disk that ARTIFACT_FOLDERS may use
+ARTIFACT_GRACE  = 60 * 60                # Seconds since last use, before an unpinned artifact may be evicted
+
+ARTIFACT_FOLDERS = ['PGNs', 'Engines', 'Networks', 'Books']
 
 IS_WINDOWS = platform.system() == 'Windows' # Don't touch this
 IS_LINUX   = platform.system() != 'Windows' # Don't touch this
 
+BUILD_CACHE = os.path.join(os.path.expanduser('~'), '.openbench', 'builds') # Shared by all workers on the host
+
 
 class Configuration:
 
@@ -113,6 +136,16 @@ class Configuration:
         self.fleet       = args.fleet    if args.fleet    else False
         self.noisy       = args.noisy    if args.noisy    else False
         self.focus       = args.focus    if args.focus    else []
+        self.build_cache = None if args.no_build_cache else os.path.abspath(args.build_cache)
+        self.ccache      = args.ccache   if args.ccache   else False
+        self.share_bins  = args.share_binaries if args.share_binaries else False
+        self.bench_runs  = max(1, int(args.bench_samples))
+        self.pin_cores   = args.pin_cores if args.pin_cores else False
+        self.cache_limit = int(args.cache_budget) * 1024 * 1024
+        self.via_relay   = args.via_relay if args.via_relay else None
+
+        # Artifacts are fetched through the site's relay, when there is one
+        utils.HTTP_RELAY = self.via_relay
 
     def check_requirements(self):
 
@@ -130,13 +163,24 @@ class Configuration:
             print ('[Error] Unable to locate C++ Compiler (g++ or clang++)')
             sys.exit()
 
+        # ccache is optional, and only used if requested
+        if self.ccache:
+            self.ccache = bool(locate_utility('ccache', force_exit=False))
+            print('Looking for ccache... [%s]' % ('Found' if self.ccache else 'Disabled'))
+
+        # Core pinning is optional, and only possible where the OS exposes the topology
+        self.topology = utils.cpu_topology() if self.pin_cores else None
+        self.pinning  = describe_topology(self.topology) if self.topology else None
+        if self.pin_cores:
+            print('Looking for CPU Topology... [%s]' % (describe_topology(self.topology)))
+
     def init_client(self):
 
         # Use Client.py's path as the base pathway
         os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
         # Ensure the folder structure for ease of coding
-        for folder in ['PGNs', 'Engines', 'Networks', 'Books']:
+        for folder in ARTIFACT_FOLDERS:
             if not os.path.isdir(folder):
                 os.mkdir(folder)
 
@@ -237,13 +281,16 @@ class ServerReporter:
     ## differing payloads. Payloads must always include the machine id, and secret token
 
     @staticmethod
-    def report(config, endpoint, payload, files=None):
+    def report(config, endpoint, payload, files=None, as_json=False):
 
         payload['machine_id'] = config.machine_id
         payload['secret']     = config.secret_token
 
-        target   = utils.url_join(config.server, endpoint)
-        response = requests.post(target, data=payload, files=files, timeout=TIMEOUT_HTTP)
+        # Most endpoints take form data, but some expect a single JSON document
+        target = utils.url_join(config.server, endpoint)
+        body   = { 'json' : payload } if as_json else { 'data' : payload, 'files' : files }
+
+        response = utils.http_request('POST', target, timeout=TIMEOUT_HTTP, compress=True, **body)
 
         # Check for a json repsone, to look for Client Version Errors
         try: as_json = response.json()
@@ -260,7 +307,7 @@ class ServerReporter:
         return response
 
     @staticmethod
-    def report_nps(config, dev_nps, base_nps):
+    def report_nps(config, dev_nps, base_nps, dev_ci=None, base_ci=None):
 
         payload = {
             'nps'      : (dev_nps + base_nps) // 2,
@@ -268,6 +315,11 @@ class ServerReporter:
             'base_nps' : int(base_nps),
         }
 
+        # Only multi-sample benches can say how noisy they were
+        if dev_ci is not None and base_ci is not None:
+            payload['dev_nps_ci' ] = dev_ci
+            payload['base_nps_ci'] = base_ci
+
         return ServerReporter.report(config, 'clientSubmitNPS', payload)
 
     @staticmethod
@@ -318,47 +370,48 @@ class ServerReporter:
         return ServerReporter.report(config, 'clientBenchError', payload)
 
     @staticmethod
-    def report_results(config, batches):
-
-        payload = {
+    def results_batch(config, batches, sequence):
 
-            'test_id'      : config.workload['test']['id'],
-            'result_id'    : config.workload['result']['id'],
+        # One delta per runner: [runner_idx, L, D, W, LL, LD, DD, DW, WW, crashes, timelosses, illegals]
+        deltas = [
+            [batch['runner_idx'], *batch['trinomial'], *batch['pentanomial'],
+             batch['crashes'], batch['timelosses'], batch['illegals']] for batch in batches
+        ]
 
-            'trinomial'    : [0, 0, 0],       # LDW
-            'pentanomial'  : [0, 0, 0, 0, 0], # LL DL DD DW WW
-
-            'crashes'      : 0, # " disconnect" or "connection stalls"
-            'timelosses'   : 0, # " loses on time "
-            'illegals'     : 0, # " illegal move "
+        payload = {
+            'version'   : RESULTS_BATCH_VERSION,
+            'test_id'   : config.workload['test']['id'],
+            'result_id' : config.workload['result']['id'],
+            'sequence'  : sequence,
+            'deltas'    : deltas,
+            'spsa'      : None,
         }
 
-        for batch in batches:
-
-            payload['trinomial'  ] = [x+y for x,y in zip(payload['trinomial'  ], batch['trinomial'  ])]
-            payload['pentanomial'] = [x+y for x,y in zip(payload['pentanomial'], batch['pentanomial'])]
+        if config.workload['test']['type'] == 'SPSA':
 
-            payload['crashes'   ] += batch['crashes'   ]
-            payload['timelosses'] += batch['timelosses']
-            payload['illegals'  ] += batch['illegals'  ]
+            # Parameters are referred to by their index in the Workload
+            params = list(config.workload['spsa'].values())
+            payload['spsa'] = [0.0] * len(params)
 
-            if config.workload['test']['type'] == 'SPSA':
+            for batch in batches:
 
                 # Pairs can be added one at a time, or in bulk
                 result = batch['trinomial'][2] - batch['trinomial'][0]
 
                 # For each param compute the update step for the Server
-                for name, param in config.workload['spsa'].items():
-                    delta = param['r'] * param['c'] * result * param['flip'][batch['runner_idx']]
-                    payload['spsa_%s' % (name)] = payload.get('spsa_%s' % (name), 0.0) + delta
+                for index, param in enumerate(params):
+                    payload['spsa'][index] += param['r'] * param['c'] * result * param['flip'][batch['runner_idx']]
 
-        # Collapse into a JSON friendly format for Django
-        payload['trinomial'  ] = ' '.join(map(str, payload['trinomial'  ]))
-        payload['pentanomial'] = ' '.join(map(str, payload['pentanomial']))
+        return payload
+
+    @staticmethod
+    def report_results(config, results_batch):
 
-        print (payload)
+        print (results_batch)
 
-        return ServerReporter.report(config, 'clientSubmitResults', payload)
+        # Copy, to keep the credentials out of the ResultsJournal
+        payload = dict(results_batch)
+        return ServerReporter.report(config, 'clientSubmitResultsBatch', payload, as_json=True)
 
     @staticmethod
     def report_heartbeat(config):
@@ -370,12 +423,13 @@ class ServerReporter:
         return ServerReporter.report(config, 'clientHeartbeat', payload)
 
     @staticmethod
-    def report_pgn(config, compressed_pgn_text):
+    def report_pgn(config, compressed_pgn_text, sequence):
 
         payload = {
             'test_id'      : config.workload['test']['id'],
             'result_id'    : config.workload['result']['id'],
             'book_index'   : config.workload['test']['book_index'],
+            'sequence'     : sequence,
             'Content-Type' : 'application/octet-stream',
         }
 
@@ -448,6 +502,10 @@ class MatchRunner:
         # DATAGEN creates their own book
         if config.workload['test']['type'] == 'DATAGEN':
 
+            # Pipelined books hold a file per runner, which is read from the top
+            if genfens_is_pipelined(config):
+                return '-openings file=Books/openbench.genfens.%d.epd format=epd order=sequential start=1' % (runner_idx)
+
             # -repeat might not be applied, so handle the book offsets
             no_reverse = not config.workload['test']['play_reverses']
             pairs      = config.workload['distribution']['games-per-runner'] // 2
@@ -579,97 +637,408 @@ class MatchRunner:
 
 class PGNHelper:
 
+    ## Handles the processing of each match runner's PGN, picking up from where the last
+    ## call left off. Every game is read exactly once, to both strip and compress it for
+    ## the upload, and to extract any games that ended with errors to report to the server
+
     @staticmethod
-    def slice_pgn_file(file):
+    def process_runner_pgns(config, pgn_files, offsets, scale_factor, final):
 
-        if not os.path.isfile(file):
-            reason = 'Unable to find %s. Match runner exited with no finished games.' % (file)
-            raise utils.OpenBenchMisssingPGNException(reason)
+        compress = config.workload['test']['upload_pgns'] != 'FALSE'
+        compact  = config.workload['test']['upload_pgns'] == 'COMPACT'
+        args     = (scale_factor, compact, compress, final)
 
-        with open(file) as pgn:
+        for file in pgn_files:
+            if final and not os.path.isfile(file):
+                reason = 'Unable to find %s. Match runner exited with no finished games.' % (file)
+                raise utils.OpenBenchMisssingPGNException(reason)
 
-            while True:
+        # Match runners may not have written anything yet while still playing
+        indices = [x for x in range(len(pgn_files)) if os.path.isfile(pgn_files[x])]
+        tasks   = [(pgn_files[x], offsets[x]) for x in indices]
 
-                headers = list(iter(lambda: pgn.readline().rstrip(), ''))
-                moves   = list(iter(lambda: pgn.readline().rstrip(), ''))
+        # Whatever remains at the end is done with one task per runner, with the
+        # results kept in runner order. Otherwise, the chunks are small enough
+        if final:
+            with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count())) as executor:
+                futures = [executor.submit(pgn_util.process_runner_pgn, *x, *args) for x in tasks]
+                outputs = [future.result() for future in futures]
 
-                if not headers or not moves:
-                    break
+        else:
+            outputs = [pgn_util.process_runner_pgn(*x, *args) for x in tasks]
+
+        # Concatenated bz2 streams decompress as a single stream
+        compressed = b''.join(output[0] for output in outputs)
+        errors     = sum((output[1] for output in outputs), [])
+
+        # Resume each PGN from where its completed games ended
+        new_offsets = list(offsets)
+        for x, output in zip(indices, outputs):
+            new_offsets[x] = output[2]
+
+        return compressed, errors, new_offsets
+
+class ResultsChannel(object):
+
+    ## Handles passing results from the match runner threads to the ResultsReporter.
+    ## Each runner adds its finished game-pairs into its own running counters, which
+    ## the ResultsReporter collects all at once when it is time to report them
+
+    def __init__(self, runner_cnt):
+        self.lock     = threading.Lock()
+        self.counters = [None] * runner_cnt
+
+    def put(self, runner_idx, results):
+
+        with self.lock:
+
+            if not (counter := self.counters[runner_idx]):
+                counter = self.counters[runner_idx] = {
+                    'trinomial'   : [0, 0, 0],       # LDW
+                    'pentanomial' : [0, 0, 0, 0, 0], # LL DL DD DW WW
+                    'crashes'     : 0,
+                    'timelosses'  : 0,
+                    'illegals'    : 0,
+                    'runner_idx'  : runner_idx,
+                }
 
-                yield (headers, moves)
+            counter['trinomial'  ] = [x+y for x,y in zip(counter['trinomial'  ], results['trinomial'  ])]
+            counter['pentanomial'] = [x+y for x,y in zip(counter['pentanomial'], results['pentanomial'])]
+
+            counter['crashes'   ] += results['crashes'   ]
+            counter['timelosses'] += results['timelosses']
+            counter['illegals'  ] += results['illegals'  ]
+
+    def collect(self):
+
+        # Hand over everything since the last collect(), as one batch per runner
+        with self.lock:
+            batches       = [x for x in self.counters if x]
+            self.counters = [None] * len(self.counters)
+
+        return batches
+
+class ResultsJournal(object):
+
+    ## Write-ahead journal of the results batches sent to the server. Each batch is written
+    ## before it is sent, and acknowledged once the server responds. Batches which were never
+    ## acknowledged, due to lost responses or a crashed Worker, are replayed on the next start.
+    ## The server discards batches it has already applied, so replaying is always safe.
+    ## Workers sharing a directory share the journal, so every write holds a host lock
 
     @staticmethod
-    def get_pgn_header(sliced_headers, header):
-        for line in sliced_headers:
-            if line.startswith('[%s ' % header):
-                return line.split('"')[1]
+    def lock():
+        return utils.HostFileLock(RESULTS_JOURNAL + '.lock')
 
     @staticmethod
-    def get_error_reason(sliced_headers):
+    def append(record):
+        with ResultsJournal.lock(), open(RESULTS_JOURNAL, 'a') as fout:
+            fout.write(json.dumps(record) + '\n')
+            fout.flush()
+            os.fsync(fout.fileno())
 
-        reason = PGNHelper.get_pgn_header(sliced_headers, 'Termination')
+    @staticmethod
+    def record_batch(results_batch):
+        ResultsJournal.append({ 'batch' : results_batch })
 
-        if reason and 'abandoned' in reason:
-            return 'Disconnect'
+    @staticmethod
+    def record_ack(results_batch):
+        ResultsJournal.append({ 'ack' : [results_batch['result_id'], results_batch['sequence']] })
 
-        if reason and 'stalled' in reason:
-            return 'Stalled'
+    @staticmethod
+    def unacknowledged():
 
-        if reason and 'illegal' in reason:
-            return 'Illegal Move'
+        if not os.path.isfile(RESULTS_JOURNAL):
+            return []
+
+        batches, acks = [], set()
+        with open(RESULTS_JOURNAL) as fin:
+            for line in fin:
+
+                # The final line may be incomplete, if we crashed while writing it
+                try: record = json.loads(line)
+                except json.decoder.JSONDecodeError: continue
+
+                if 'batch' in record:
+                    batches.append(record['batch'])
+                if 'ack' in record:
+                    acks.add(tuple(record['ack']))
+
+        return [x for x in batches if (x['result_id'], x['sequence']) not in acks]
 
     @staticmethod
-    def pretty_format(headers, moves):
-        return '\n'.join(headers + [''] + moves)
+    def last_sequence(result_id):
+
+        # Never reuse a sequence number still waiting in the journal
+        sequences = [x['sequence'] for x in ResultsJournal.unacknowledged() if x['result_id'] == result_id]
+        return max(sequences, default=0)
+
+    @staticmethod
+    def compact():
+
+        # Rewrite the journal, with only the batches still waiting on the server.
+        # Holding the lock throughout ensures no other Worker appends in between
+        with ResultsJournal.lock():
+
+            if not (remaining := ResultsJournal.unacknowledged()):
+                if os.path.isfile(RESULTS_JOURNAL):
+                    os.remove(RESULTS_JOURNAL)
+                return
+
+            with open(RESULTS_JOURNAL + '.tmp', 'w') as fout:
+                for results_batch in remaining:
+                    fout.write(json.dumps({ 'batch' : results_batch }) + '\n')
+                fout.flush()
+                os.fsync(fout.fileno())
+
+            os.replace(RESULTS_JOURNAL + '.tmp', RESULTS_JOURNAL)
+
+    @staticmethod
+    def replay(config):
+
+        # Returns False if any batch is left for a later attempt. The server only
+        # remembers the latest sequence applied for each Result, so no new batches
+        # may be sent for a Result until every earlier one has been delivered
+        delivered = True
+
+        for results_batch in ResultsJournal.unacknowledged():
+
+            print ('Replaying results batch #%d for Result %d' % (results_batch['sequence'], results_batch['result_id']))
+
+            try: # Either the server takes the batch, or the batch is no longer valid
+                ServerReporter.report_results(config, results_batch).json()
+
+            except utils.OpenBenchFatalWorkerException as error:
+
+                # Errors with our credentials or config do not mean the batch was bad
+                if any(x in error.message for x in WORKER_ERRORS):
+                    raise
+
+                # Anything else will be rejected every time, so give up on the batch
+                print ('[Note] Dropping results batch #%d for Result %d: %s' % (
+                    results_batch['sequence'], results_batch['result_id'], error.message.split(': ', 1)[-1]))
+
+            except BadVersionException:
+                raise
+
+            except Exception: # Keep the rest of the journal, for another attempt later
+                traceback.print_exc()
+                print ('[Note] Failed to replay results to server...')
+                delivered = False
+                break
+
+            ResultsJournal.record_ack(results_batch)
+
+        ResultsJournal.compact()
+        return delivered
+
+class BenchCache(object):
+
+    ## Remembers the results of full benches, keyed by the binary's contents, the network,
+    ## and the number of threads. A cached result is only trusted while it is fresh, and
+    ## while a short single-core search still runs at the speed it did at the time
+
+    @staticmethod
+    def key(binary, network, threads, pinned=False):
+
+        hasher = hashlib.sha256()
+        with open(binary, 'rb') as fin:
+            while (chunk := fin.read(1024 * 1024)):
+                hasher.update(chunk)
+
+        network = os.path.basename(network) if network else None
+        return '%s-%s-%d%s' % (hasher.hexdigest(), network, threads, '-pinned' if pinned else '')
+
+    @staticmethod
+    def load():
+
+        try:
+            with open(BENCH_CACHE) as fin:
+                return json.load(fin)
+
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def lookup(key):
+
+        entry = BenchCache.load().get(key)
+        if entry and time.time() - entry['time'] < BENCH_CACHE_TTL:
+            return entry
+
+    @staticmethod
+    def store(key, speed, nodes, spot):
+
+        # Workers sharing this directory share the cache, so hold a lock while merging.
+        # Failing to remember a result is never worth failing the Workload over
+        try:
+            with utils.HostFileLock(BENCH_CACHE + '.lock'):
+
+                # Drop anything stale, while adding the new entry
+                cache = { k : v for k, v in BenchCache.load().items() if time.time() - v['time'] < BENCH_CACHE_TTL }
+                cache[key] = { 'speed' : speed, 'nodes' : nodes, 'spot' : spot, 'time' : time.time() }
+
+                with open(BENCH_CACHE + '.tmp', 'w') as fout:
+                    json.dump(cache, fout)
+                os.replace(BENCH_CACHE + '.tmp', BENCH_CACHE)
+
+        except OSError:
+            traceback.print_exc()
+            print ('[Note] Failed to update the bench cache...')
+
+class ArtifactCache(object):
+
+    ## Keeps ARTIFACT_FOLDERS within a disk budget, evicting the least recently used
+    ## artifacts first. Workloads pin everything they use, so that no worker sharing
+    ## this directory evicts it. The index, and all changes to it, are under a host lock
+
+    @staticmethod
+    def artifact_key(path):
+        path = path.replace(os.sep, '/')
+        return path[:-4] if path.endswith('.exe') else path
+
+    @staticmethod
+    def load():
+
+        try:
+            with open(ARTIFACT_INDEX) as fin:
+                return json.load(fin)
+
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def save(index):
+
+        with open(ARTIFACT_INDEX + '.tmp', 'w') as fout:
+            json.dump(index, fout)
+        os.replace(ARTIFACT_INDEX + '.tmp', ARTIFACT_INDEX)
+
+    @staticmethod
+    def update_pins(paths, delta):
+
+        with utils.HostFileLock(ARTIFACT_INDEX + '.lock'):
+
+            index = ArtifactCache.load()
+            pid   = str(os.getpid())
+
+            for key in map(ArtifactCache.artifact_key, paths):
+                entry = index.setdefault(key, { 'size' : 0, 'pins' : {} })
+                entry['used'] = time.time()
+                entry['pins'][pid] = entry['pins'].get(pid, 0) + delta
+                entry['pins'] = { k : v for k, v in entry['pins'].items() if v > 0 }
+
+            ArtifactCache.save(index)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def pinned(paths):
+
+        ArtifactCache.update_pins(paths, +1)
+        try: yield
+        finally: ArtifactCache.update_pins(paths, -1)
+
+    @staticmethod
+    def evict(budget):
+
+        with utils.HostFileLock(ARTIFACT_INDEX + '.lock'):
+
+            index = ArtifactCache.load()
+
+            # Group the files on disk by artifact, since binaries may carry a .exe
+            on_disk = {}
+            for folder in ARTIFACT_FOLDERS:
+                for file in filter(lambda x: not x.endswith('.lock'), os.listdir(folder)):
+                    path = os.path.join(folder, file)
+                    on_disk.setdefault(ArtifactCache.artifact_key(path), []).append(path)
+
+            # Refresh sizes, adopt unknown files, and forget pins held by dead workers
+            for key, paths in on_disk.items():
+                entry = index.setdefault(key, { 'used' : 0, 'pins' : {} })
+                entry['used'] = max(entry['used'], *map(os.path.getmtime, paths))
+                entry['size'] = sum(map(os.path.getsize, paths))
+                entry['pins'] = { k : v for k, v in entry['pins'].items() if psutil.pid_exists(int(k)) }
+
+            # Artifacts that are gone are forgotten, unless a workload is about to create them
+            index = { k : v for k, v in index.items() if k in on_disk or v['pins'] }
+            total = sum(entry['size'] for entry in index.values())
+            freed = []
+
+            for key in sorted(on_disk, key=lambda x: index[x]['used']):
+
+                if total <= budget:
+                    break
+
+                # Never evict what is in use, nor what was only just fetched
+                if index[key]['pins'] or time.time() - index[key]['used'] < ARTIFACT_GRACE:
+                    continue
+
+                for path in on_disk[key]:
+                    try: os.remove(path)
+                    except OSError: pass
+
+                total -= index.pop(key)['size']
+                freed.append(key)
+
+            ArtifactCache.save(index)
+
+        if freed:
+            print ('Evicted %d artifacts, %.1fMB remain cached' % (len(freed), total / (1024 ** 2)))
 
 class ResultsReporter(object):
 
-    ## Handles idle looping while reading from the results Queue that the match runner
-    ## workers place results into. Once finished, this class can be used to collect
-    ## all of the errors in the PGN, and send htem back to the server.
+    ## Handles idle looping while collecting results from the ResultsChannel that the
+    ## match runner workers place results into, and sending those back to the server.
 
-    def __init__(self, config, tasks, results_queue, abort_flag):
+    def __init__(self, config, tasks, channel, abort_flag, pgn_files, scale_factor):
         self.config        = config
         self.tasks         = tasks
-        self.results_queue = results_queue
+        self.channel       = channel
         self.abort_flag    = abort_flag
+        self.pgn_files     = pgn_files
+        self.scale_factor  = scale_factor
+
+        # Results are sent in numbered batches, continuing from the last applied
+        result_id          = config.workload['result']['id']
+        self.sequence      = max(config.workload['result']['sequence'], ResultsJournal.last_sequence(result_id))
+        self.in_flight     = None
+
+        # Track how much of each PGN has been processed, and what was sent
+        self.pgn_offsets   = [0] * len(pgn_files)
+        self.pgn_sequence  = 0
+        self.last_pgn      = time.time()
 
     def process_until_finished(self):
 
-        self.last_report = 0
-        self.pending     = []
+        self.last_report     = 0
+        self.pending         = []
+        self.report_interval = REPORT_INTERVAL
 
         # Don't report until finished, for BULK SPSA tests
         self.bulk = self.config.workload['test']['type'] == 'SPSA'
         self.bulk = self.bulk and self.config.workload['reporting_type'] == 'BULK'
 
-        # Block up-to 5 seconds to get a new result
-        def get_next_result():
-            try: return self.results_queue.get(timeout=5)
-            except queue.Empty: return False
-
         # Collect results until all Tasks are done
         while any(not task.done() for task in self.tasks):
 
-            result = get_next_result()
-            if result:
-                self.pending.append(result)
+            # Sleep until a report is due, or all the Tasks finish, but still watch for openbench.exit
+            timeout = min(TIMEOUT_EXITFILE, max(0, self.last_report + self.report_interval - time.time()))
+            wait_for_futures(self.tasks, timeout=timeout)
+            self.pending += self.channel.collect()
 
-            # Send results, or a heartbeat, every REPORT_INTERVAL seconds until done
-            if self.send_results(report_interval=REPORT_INTERVAL):
+            # Send results, or a heartbeat, as often as the server requests until done
+            if self.send_results(report_interval=self.report_interval):
                 return
 
+            # Upload finished games every PGN_INTERVAL seconds until done
+            self.send_pgns(report_interval=PGN_INTERVAL)
+
             # Kill everything if openbench.exit is created
             if os.path.isfile('openbench.exit'):
                 return self.abort_flag.set()
 
-        # Exhaust the Results Queue completely since Tasks are done
-        while True:
-            result = get_next_result()
-            if result:
-                self.pending.append(result)
-            else:
-                break
+        # Collect anything left in the ResultsChannel since Tasks are done
+        self.pending += self.channel.collect()
 
         # Send any remaining results immediately
         self.send_results(report_interval=0, final_report=True)
@@ -683,14 +1052,28 @@ class ResultsReporter(object):
         try:
 
             # Heartbeat when no results, or still awaiting bulk results
-            if not self.pending or (self.bulk and not final_report):
+            if not (self.pending or self.in_flight) or (self.bulk and not final_report):
                 response = ServerReporter.report_heartbeat(self.config).json()
                 self.last_report = time.time()
 
-            else: # Send all of the queued Results at once
-                response = ServerReporter.report_results(self.config, self.pending).json()
-                self.last_report = time.time()
-                self.pending = []
+            # Resend an unacknowledged batch as-is, before batching up anything new
+            else:
+                while self.pending or self.in_flight:
+
+                    if not self.in_flight:
+                        self.sequence += 1
+                        self.in_flight = ServerReporter.results_batch(self.config, self.pending, self.sequence)
+                        self.pending   = []
+                        ResultsJournal.record_batch(self.in_flight)
+
+                    response = ServerReporter.report_results(self.config, self.in_flight).json()
+                    self.last_report = time.time()
+
+                    ResultsJournal.record_ack(self.in_flight)
+                    self.in_flight = None
+
+            # Server decides how often to report, based on its load and the test's state
+            self.report_interval = response.get('next_report_in', REPORT_INTERVAL)
 
             # If the test ended, kill all tasks
             if 'stop' in response:
@@ -707,19 +1090,39 @@ class ResultsReporter(object):
             print ('[Note] Failed to upload results to server...')
             self.last_report = time.time()
 
-    def send_errors(self, timestamp, runner_cnt):
+    def send_pgns(self, report_interval, final_report=False):
 
-        for x in range(runner_cnt):
+        # Do not send more often than report_interval dictates
+        if self.last_pgn + report_interval > time.time():
+            return
 
-            # Reuse logic that was given to match runner to decide the PGN name
-            fname = MatchRunner.pgn_name(self.config, timestamp, x)
+        try:
+            compressed, errors, offsets = PGNHelper.process_runner_pgns(
+                self.config, self.pgn_files, self.pgn_offsets, self.scale_factor, final_report)
+
+            # Only advance past the games once the server has them
+            if compressed:
+                ServerReporter.report_pgn(self.config, compressed, self.pgn_sequence)
+                self.pgn_sequence += 1
+            self.pgn_offsets = offsets
 
             # For any game with weird Termination, report it
-            for header, moves in PGNHelper.slice_pgn_file(fname):
-                error = PGNHelper.get_error_reason(header)
-                if error:
-                    as_str = PGNHelper.pretty_format(header, moves)
-                    ServerReporter.report_engine_error(self.config, error, as_str)
+            for error, pgn in errors:
+                ServerReporter.report_engine_error(self.config, error, pgn)
+
+        except (BadVersionException, utils.OpenBenchFatalWorkerException):
+            raise
+
+        except Exception:
+
+            # Anything remaining at the end of the workload must not be dropped quietly
+            if final_report:
+                raise
+
+            traceback.print_exc()
+            print ('[Note] Failed to upload PGNs to server...')
+
+        self.last_pgn = time.time()
 
 
 def get_version(program):
@@ -766,25 +1169,15 @@ def set_runner_permissions():
         print ('[ERROR] Unable to set execute permissions on fastchess-ob')
 
 
-def cleanup_client():
-
-    SECONDS_PER_DAY   = 60 * 60 * 24
-    SECONDS_PER_WEEK  = SECONDS_PER_DAY * 7
-    SECONDS_PER_MONTH = SECONDS_PER_WEEK * 4
+def cleanup_client(config):
 
-    file_age = lambda x: time.time() - os.path.getmtime(x)
+    SECONDS_PER_MONTH = 60 * 60 * 24 * 7 * 4
 
-    for file in os.listdir('PGNs'):
-        if file_age(os.path.join('PGNs', file)) > SECONDS_PER_DAY:
-            os.remove(os.path.join('PGNs', file))
+    # Least recently used Engines, Networks, Books, and PGNs go first
+    ArtifactCache.evict(config.cache_limit)
 
-    for file in os.listdir('Engines'):
-        if file_age(os.path.join('Engines', file)) > SECONDS_PER_WEEK:
-            os.remove(os.path.join('Engines', file))
-
-    for file in os.listdir('Networks'):
-        if file_age(os.path.join('Networks', file)) > SECONDS_PER_MONTH:
-            os.remove(os.path.join('Networks', file))
+    if config.build_cache:
+        utils.prune_build_cache(config.build_cache, SECONDS_PER_MONTH)
 
 def validate_syzygy_exists(config, K):
 
@@ -883,9 +1276,15 @@ def find_pgn_error(reason, command):
 def determine_scale_factor(config, dev_name, dev_network, base_name, base_network):
 
     # Run the benchmarks and compute the scaling NPS value
-    dev_nps  = safe_run_benchmarks(config, 'dev' , dev_name , dev_network )
-    base_nps = safe_run_benchmarks(config, 'base', base_name, base_network)
-    ServerReporter.report_nps(config, dev_nps, base_nps)
+    if config.bench_runs > 1:
+        dev_nps, base_nps, dev_ci, base_ci = safe_run_interleaved_benchmarks(
+            config, dev_name, dev_network, base_name, base_network)
+        ServerReporter.report_nps(config, dev_nps, base_nps, dev_ci, base_ci)
+
+    else:
+        dev_nps  = safe_run_benchmarks(config, 'dev' , dev_name , dev_network )
+        base_nps = safe_run_benchmarks(config, 'base', base_name, base_network)
+        ServerReporter.report_nps(config, dev_nps, base_nps)
 
     dev_factor = base_factor = None
 
@@ -923,7 +1322,7 @@ def server_configure_match_runner(config, name, build_func):
     print ('> Requesting %s configuration from openbench' % name)
     target  = url_join(config.server, 'clientMatchRunnerVersionRef')
     payload = { 'username' : config.username, 'password' : config.password }
-    data    = requests.post(target, data=payload, timeout=TIMEOUT_HTTP).json()
+    data    = utils.http_request('POST', target, data=payload, timeout=TIMEOUT_HTTP, idempotent=True).json()
 
     # Might already have a sufficiently new Fastchess binary
     print ('> Checking for existing %s-ob binary' % name)
@@ -939,7 +1338,8 @@ def server_configure_match_runner(config, name, build_func):
     # Download a .zip archive of the git-ref from the specified repo
     repo_url, repo_ref = data['%s_repo_url' % name], data['%s_repo_ref' % name]
     print ('> Downloading %s from %s' % (repo_ref, repo_url))
-    response = requests.get(url_join(repo_url, 'archive', '%s.zip' % repo_ref))
+    target   = url_join(repo_url, 'archive', '%s.zip' % repo_ref)
+    response = utils.http_request('GET', target, idempotent=True, relay=utils.RELAY_MUTABLE)
 
     with tempfile.TemporaryDirectory() as temp_dir:
 
@@ -992,7 +1392,7 @@ def server_configure_worker(config):
 
     # Server tells us how to build or obtain binaries
     target = utils.url_join(config.server, 'clientGetBuildInfo')
-    data   = requests.get(target, timeout=TIMEOUT_HTTP).json()
+    data   = utils.http_request('GET', target, timeout=TIMEOUT_HTTP, idempotent=True).json()
 
     config.scan_for_compilers(data)      # Public engine build tools
     config.scan_for_private_tokens(data) # Private engine access tokens
@@ -1018,6 +1418,7 @@ def server_configure_worker(config):
         'syzygy_max'     : config.syzygy_max,     # Whether or not the machine has Syzygy support
         'noisy'          : config.noisy,          # Whether our results are unstable for time-based workloads
         'focus'          : config.focus,          # List of engines we have a preference to help
+        'pinning'        : config.pinning,        # Topology that benches and runners are pinned to, or None
         'cxx_comp'       : config.cxx_comp,       # C++ Compiler used to build Fastchess binaries
         'fastchess_ver'  : config.fastchess_ver,  # Fastchess Version, set during server_configure_fastchess()
         'client_ver'     : CLIENT_VERSION,        # Version of the Client, which the server may reject
@@ -1031,7 +1432,7 @@ def server_configure_worker(config):
 
     # Send all of this to the server, and get a Machine Id + Secret Token
     target   = utils.url_join(config.server, 'clientWorkerInfo')
-    response = requests.post(target, data=payload, timeout=TIMEOUT_HTTP).json()
+    response = utils.http_request('POST', target, data=payload, timeout=TIMEOUT_HTTP).json()
 
     # Throw all the way back to the client.py
     if 'Bad Client Version' in response.get('error', ''):
@@ -1051,7 +1452,7 @@ def server_request_workload(config):
 
     payload  = { 'machine_id' : config.machine_id, 'secret' : config.secret_token, 'blacklist' : config.blacklist }
     target   = utils.url_join(config.server, 'clientGetWorkload')
-    response = requests.post(target, data=payload, timeout=TIMEOUT_HTTP)
+    response = utils.http_request('POST', target, data=payload, timeout=TIMEOUT_HTTP)
 
     # Server errors produce garbage back, which we should not alarm a user with
     try: response = response.json()
@@ -1079,23 +1480,11 @@ def server_request_workload(config):
 
 def complete_workload(config):
 
-    # Download the opening book, throws an exception on corruption
-    utils.download_opening_book(
-        config.workload['test']['book']['sha'   ],
-        config.workload['test']['book']['source'],
-        config.workload['test']['book']['name'  ],
-    )
-
-    # Download each NNUE file, throws an exception on corruption
-    dev_network  = safe_download_network_weights(config, 'dev' )
-    base_network = safe_download_network_weights(config, 'base')
-
-    # Build or download each engine, or exit if an error occured
-    dev_name  = safe_download_engine(config, 'dev' , dev_network )
-    base_name = safe_download_engine(config, 'base', base_network)
+    # Fetch the book and networks, and build or download each engine, concurrently
+    dev_name, dev_network, base_name, base_network = prepare_workload(config)
 
-    # Datagen creates a book on-the-fly
-    if config.workload['test']['type'] == 'DATAGEN':
+    # Datagen creates a book on-the-fly, up front unless pipelined with the runners
+    if config.workload['test']['type'] == 'DATAGEN' and not genfens_is_pipelined(config):
         safe_create_genfens_opening_book(config, dev_name, dev_network)
 
     # Scale time control based on the Engine's local NPS
@@ -1115,19 +1504,39 @@ def complete_workload(config):
     with ThreadPoolExecutor(max_workers=runner_cnt) as executor:
 
         timestamp  = time.time()
-        results    = multiprocessing.Queue()
+        channel    = ResultsChannel(runner_cnt)
         abort_flag = threading.Event()
 
-        tasks = [] # Create each of the match runner workers
-        for x in range(runner_cnt):
-            cmd = build_runner_command(config, dev_name, base_name, scale_factor, timestamp, x)
-            tasks.append(executor.submit(run_and_parse_runner, config, cmd, x, results, abort_flag))
+        # Each copy gets its own socket or cache domain, when pinning, with enough cores for its games
+        affinity = utils.partition_cpus(config.topology, runner_cnt, concurrency_per) or [None] * runner_cnt
+
+        tasks = [] # Create each of the match runner workers, once their openings exist
+        try:
+            for x in range(runner_cnt):
+
+                # Earlier runners are already playing while this slice is generated, so
+                # only use the share of threads, and any CPUs, of those yet to start
+                if genfens_is_pipelined(config):
+                    threads = (config.threads // runner_cnt) * (runner_cnt - x)
+                    cpus    = set().union(*affinity[x:]) if affinity[x] else None
+                    safe_create_genfens_opening_book(config, dev_name, dev_network, x, threads, cpus)
+
+                cmd = build_runner_command(config, dev_name, base_name, scale_factor, timestamp, x)
+                tasks.append(executor.submit(run_and_parse_runner, config, cmd, x, channel, abort_flag, affinity[x]))
+
+        # Stop any runners that were already launched
+        except (Exception, KeyboardInterrupt):
+            abort_flag.set()
+            MatchRunner.kill_everything(dev_name, base_name)
+            raise
+
+        # Reuse logic that was given to match runner to decide the PGN names
+        pgn_files = [MatchRunner.pgn_name(config, timestamp, x) for x in range(runner_cnt)]
 
         # Process the Queue until we exit, finish, or are told to stop by the server
         try:
-            rr = ResultsReporter(config, tasks, results, abort_flag)
+            rr = ResultsReporter(config, tasks, channel, abort_flag, pgn_files, scale_factor)
             rr.process_until_finished()
-            rr.send_errors(timestamp, runner_cnt)
             MatchRunner.kill_everything(dev_name, base_name)
 
         # Kill everything during an Exception, but print it
@@ -1136,11 +1545,108 @@ def complete_workload(config):
             MatchRunner.kill_everything(dev_name, base_name)
             raise
 
-        # Upload the PGN if requested
-        if config.workload['test']['upload_pgns'] != 'FALSE':
-            compact    = config.workload['test']['upload_pgns'] == 'COMPACT'
-            pgn_files  = [MatchRunner.pgn_name(config, timestamp, x) for x in range(runner_cnt)]
-            ServerReporter.report_pgn(config, pgn_util.compress_list_of_pgns(pgn_files, scale_factor, compact))
+    # Strip, compress, and scan for errors whatever remains of the PGNs in parallel
+    print ('\nProcessing PGNs from %d match runner copies...' % (runner_cnt))
+    rr.send_pgns(report_interval=0, final_report=True)
+
+def prepare_workload(config):
+
+    # Each engine waits only for its own network, while everything else runs at once.
+    # Shared networks or binaries between dev and base are only fetched or built once.
+    # Throws the first exception encountered, in the same order as a sequential setup
+
+    timings = {}
+    start   = time.time()
+
+    def timed(label, func, *args):
+        step_start = time.time()
+        try: return func(*args)
+        finally: timings[label] = time.time() - step_start
+
+    def engine_step(branch, network, jobs):
+        return timed('%s engine' % (branch), safe_download_engine, config, branch, network.result(), jobs)
+
+    # Determine which steps are unique, and which of the engines will need to be compiled
+    net_shas  = { branch : config.workload['test'][branch]['network'] for branch in ('dev', 'base') }
+    bin_names = { branch : workload_binary_name(config, branch) for branch in ('dev', 'base') }
+    compiles  = set(bin_names[branch] for branch in ('dev', 'base') if engine_needs_compiling(config, branch))
+
+    # Concurrent builds split the CPU, rather than each running an unbounded make -j
+    jobs = max(1, config.logical_cores // len(compiles)) if len(compiles) > 1 else None
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+
+        book = executor.submit(timed, 'book', utils.download_opening_book,
+            config.workload['test']['book']['sha'   ],
+            config.workload['test']['book']['source'],
+            config.workload['test']['book']['name'  ],
+        )
+
+        networks = { 'dev' : executor.submit(timed, 'dev network', safe_download_network_weights, config, 'dev') }
+        networks['base'] = networks['dev'] if net_shas['base'] == net_shas['dev'] else \
+            executor.submit(timed, 'base network', safe_download_network_weights, config, 'base')
+
+        engines = { 'dev' : executor.submit(engine_step, 'dev', networks['dev'], jobs) }
+        engines['base'] = engines['dev'] if bin_names['base'] == bin_names['dev'] else \
+            executor.submit(engine_step, 'base', networks['base'], jobs)
+
+        book.result()
+        dev_network, base_network = networks['dev'].result(), networks['base'].result()
+        dev_name   , base_name    = engines ['dev'].result(), engines ['base'].result()
+
+    print ('\nPrepared Workload in %.2fs (%s)' % (time.time() - start,
+        ', '.join('%s %.2fs' % (label, timings[label]) for label in sorted(timings))))
+
+    return dev_name, dev_network, base_name, base_network
+
+def workload_binary_name(config, branch):
+
+    # Mirrors the naming done in safe_download_engine(), without any side effects
+    net_sha  = config.workload['test'][branch]['network']
+    net_path = os.path.join('Networks', net_sha) if net_sha and net_sha != 'None' else None
+
+    return utils.engine_binary_name(
+        config.workload['test'][branch]['engine'],
+        config.workload['test'][branch]['sha'],
+        net_path, config.workload['test'][branch]['private'])
+
+def workload_artifacts(config):
+
+    # Everything in ARTIFACT_FOLDERS that the Workload will use, whether or not it exists yet
+    artifacts = [os.path.join('Engines', workload_binary_name(config, branch)) for branch in ('dev', 'base')]
+
+    for branch in ('dev', 'base'):
+        net_sha = config.workload['test'][branch]['network']
+        if net_sha and net_sha != 'None':
+            artifacts.append(os.path.join('Networks', net_sha))
+
+    if config.workload['test']['book']['name'].upper() != 'NONE':
+        artifacts.append(os.path.join('Books', config.workload['test']['book']['name']))
+
+    return artifacts
+
+def engine_needs_compiling(config, branch):
+
+    if config.workload['test'][branch]['private']:
+        return False
+
+    net_sha    = config.workload['test'][branch]['network']
+    net_path   = os.path.join('Networks', net_sha) if net_sha and net_sha != 'None' else None
+    out_path   = os.path.join('Engines', workload_binary_name(config, branch))
+    cache_path = build_cache_path(config, branch, net_path)
+
+    return not utils.check_for_engine_binary(out_path) \
+       and not (cache_path and utils.check_for_engine_binary(cache_path))
+
+def build_cache_path(config, branch, net_path):
+
+    if not config.build_cache:
+        return None
+
+    engine = config.workload['test'][branch]['engine']
+    return os.path.join(config.build_cache, utils.build_cache_key(
+        engine, config.workload['test'][branch]['sha'], config.workload['test'][branch]['build']['path'],
+        *config.compilers[engine], net_path, config.cpu_flags))
 
 def safe_download_network_weights(config, branch):
 
@@ -1161,7 +1667,7 @@ def safe_download_network_weights(config, branch):
 
     return net_path
 
-def safe_download_engine(config, branch, net_path):
+def safe_download_engine(config, branch, net_path, jobs=None):
 
     # Wraps utils.py:download_public_engine() and utils.py:download_private_engine()
 
@@ -1186,12 +1692,24 @@ def safe_download_engine(config, branch, net_path):
 
     else:
 
-        make_path = config.workload['test'][branch]['build']['path']
-        compiler  = config.compilers[engine][0]
+        make_path  = config.workload['test'][branch]['build']['path']
+        compiler   = config.compilers[engine][0]
+        cache_path = build_cache_path(config, branch, net_path)
+        compiling  = engine_needs_compiling(config, branch)
+
+        # Prefer a verified binary built by a compatible Worker, over compiling our own
+        if compiling and config.share_bins and safe_download_shared_binary(config, branch, net_path, out_path):
+            return os.path.basename(utils.check_for_engine_binary(out_path))
 
         try:
-            return utils.download_public_engine(
-                engine, net_path, branch_name, source, make_path, out_path, compiler)
+            bin_name = utils.download_public_engine(
+                engine, net_path, branch_name, source, make_path, out_path, compiler, jobs, cache_path, config.ccache)
+
+            # Offer up anything we had to compile, for other Workers to use
+            if compiling and config.share_bins:
+                safe_upload_shared_binary(config, branch, net_path, os.path.join('Engines', bin_name))
+
+            return bin_name
 
         except utils.OpenBenchBuildFailedException as error:
 
@@ -1204,19 +1722,78 @@ def safe_download_engine(config, branch, net_path):
             ServerReporter.report_build_fail(config, branch, error.logs)
             raise
 
-def safe_create_genfens_opening_book(config, dev_name, dev_network):
+def shared_binary_fields(config, branch, net_path):
+
+    engine = config.workload['test'][branch]['engine']
+    return utils.shared_binary_fields(engine, config.workload['test'][branch]['sha'],
+        net_path, *config.compilers[engine], config.cpu_flags)
+
+def safe_download_shared_binary(config, branch, net_path, out_path):
+
+    # Wraps utils.py:download_shared_binary(), never raising, and verifying it can run
+
+    credentials = { 'machine_id' : config.machine_id, 'secret' : config.secret_token }
+    fields      = shared_binary_fields(config, branch, net_path)
+
+    try:
+        if not utils.download_shared_binary(config.server, credentials, fields, out_path):
+            return False
+
+    except Exception:
+        traceback.print_exc()
+        print ('[Note] Failed to download a shared binary...')
+        return False
+
+    if not utils.engine_speaks_uci(utils.check_for_engine_binary(out_path)):
+        print ('[Note] Shared binary does not run on this machine. Building instead...')
+        os.remove(utils.check_for_engine_binary(out_path))
+        return False
+
+    return True
+
+def safe_upload_shared_binary(config, branch, net_path, binary):
+
+    # Wraps utils.py:upload_shared_binary(), never raising, as sharing is only an optimization
+
+    credentials = { 'machine_id' : config.machine_id, 'secret' : config.secret_token }
+    fields      = shared_binary_fields(config, branch, net_path)
+
+    try: utils.upload_shared_binary(config.server, credentials, fields, utils.check_for_engine_binary(binary))
+    except Exception:
+        traceback.print_exc()
+        print ('[Note] Failed to upload a shared binary...')
+
+def genfens_is_pipelined(config):
+
+    # With many runners, each runner's openings are generated just before it starts
+    return config.workload['test']['type'] == 'DATAGEN' \
+       and config.workload['distribution']['runner-count'] > 1
+
+def genfens_book_path(runner_idx=None):
+
+    # The whole book, or the slice for a single runner when pipelined
+    if runner_idx is None:
+        return os.path.join('Books', 'openbench.genfens.epd')
+    return os.path.join('Books', 'openbench.genfens.%d.epd' % (runner_idx))
+
+def safe_create_genfens_opening_book(config, dev_name, dev_network, runner_idx=None, threads=None, cpus=None):
+
+    seeds   = config.workload['test']['genfens_seeds']
+    threads = max(1, threads or config.threads)
 
-    with open(os.path.join('Books', 'openbench.genfens.epd'), 'w') as fout:
+    with open(genfens_book_path(runner_idx), 'w') as fout:
 
         args = {
-            'N'       : genfens.genfens_required_openings_each(config),
+            'N'       : genfens.genfens_required_openings_each(config) if runner_idx is None
+                        else genfens.genfens_required_openings_slice(config, threads),
             'book'    : genfens.genfens_book_input_name(config),
-            'seeds'   : config.workload['test']['genfens_seeds'],
+            'seeds'   : seeds if runner_idx is None else genfens.genfens_slice_seeds(seeds, runner_idx),
             'extra'   : config.workload['test']['genfens_args'],
             'private' : config.workload['test']['dev']['private'],
             'engine'  : os.path.join('Engines', dev_name),
             'network' : dev_network,
-            'threads' : config.threads,
+            'threads' : threads,
+            'cpus'    : cpus,
             'output'  : fout,
         }
 
@@ -1234,9 +1811,29 @@ def safe_run_benchmarks(config, branch, engine, network):
     binary   = os.path.join('Engines', engine)
 
     try:
-        print('\nRunning %dx Benchmarks for %s' % (config.threads, name))
-        speed, nodes = bench.run_benchmark(
-            binary, network, private, config.threads, 1, expected)
+        key    = BenchCache.key(utils.check_for_engine_binary(binary), network, config.threads, bool(config.topology))
+        cached = BenchCache.lookup(key)
+        cpus   = bench_affinity(config, 1)
+        drift  = None
+
+        # Only a fresh result for the expected bench is worth a spot check
+        if cached and cached.get('nodes') == expected and cached.get('spot'):
+            print('\nRunning Spot Check for %s' % (name))
+            spot  = bench.run_spot_check(binary, network, private, BENCH_SPOT_NODES, cpus[0] if cpus else None)
+            drift = abs(spot / cached['spot'] - 1.0) if spot else None
+
+        if drift is not None and drift <= BENCH_DRIFT_LIMIT:
+            print('Using cached %dx Benchmarks for %s (%.1f%% drift)' % (config.threads, name, 100 * drift))
+            speed, nodes = cached['speed'], cached['nodes']
+
+        else:
+            print('\nRunning %dx Benchmarks for %s' % (config.threads, name))
+            speed, nodes = bench.run_benchmark(
+                binary, network, private, config.threads, 1, expected, bench_affinity(config, config.threads))
+
+            # The reference for later spot checks, taken under the same conditions
+            spot = bench.run_spot_check(binary, network, private, BENCH_SPOT_NODES, cpus[0] if cpus else None)
+            BenchCache.store(key, speed, nodes, spot)
 
     except utils.OpenBenchBadBenchException as error:
         ServerReporter.report_bad_bench(config, error.message)
@@ -1246,6 +1843,65 @@ def safe_run_benchmarks(config, branch, engine, network):
     print('Speed for %s is %d' % (name, speed))
     return speed
 
+def safe_run_interleaved_benchmarks(config, dev_name, dev_network, base_name, base_network):
+
+    engines = []
+    for branch, engine, network in [('dev', dev_name, dev_network), ('base', base_name, base_network)]:
+        private  = config.workload['test'][branch]['private']
+        expected = int(config.workload['test'][branch]['bench'])
+        engines.append((os.path.join('Engines', engine), network, private, expected))
+
+    dev_speeds, base_speeds = [], []
+
+    try:
+        # Keep adding samples until both engines are measured precisely enough
+        for ii in range(BENCH_MAX_ROUNDS):
+
+            print('\nRunning %dx%d Interleaved Benchmarks (Round %d)' % (
+                config.bench_runs, config.threads, ii + 1))
+
+            dev, base = bench.run_interleaved_benchmarks(
+                engines, config.threads, config.bench_runs, bench_affinity(config, config.threads))
+            dev_speeds.extend(dev); base_speeds.extend(base)
+
+            dev_nps , dev_ci  = bench.sample_statistics(dev_speeds )
+            base_nps, base_ci = bench.sample_statistics(base_speeds)
+
+            print('Speed for %s is %d (+- %.2f%%)' % (config.workload['test']['dev' ]['name'], dev_nps , 100 * dev_ci ))
+            print('Speed for %s is %d (+- %.2f%%)' % (config.workload['test']['base']['name'], base_nps, 100 * base_ci))
+
+            if max(dev_ci, base_ci) <= BENCH_CI_LIMIT:
+                break
+
+    except utils.OpenBenchBadBenchException as error:
+        ServerReporter.report_bad_bench(config, error.message)
+        raise
+
+    return int(dev_nps), int(base_nps), dev_ci, base_ci
+
+
+def bench_affinity(config, threads):
+
+    # One physical core per bench, or a single logical CPU once we run out of cores
+    if not config.topology:
+        return None
+
+    cores = [core for domain in config.topology for core in domain]
+    if threads <= len(cores):
+        return [set(core) for core in cores[:threads]]
+
+    # First siblings of every core, then second siblings, and so on
+    cpus = [core[ii] for ii in range(max(map(len, cores))) for core in cores if ii < len(core)]
+    return [{ cpu } for cpu in cpus[:threads]] if threads <= len(cpus) else None
+
+def describe_topology(topology):
+
+    if not topology:
+        return 'Unsupported'
+
+    cores = sum(len(domain) for domain in topology)
+    cpus  = sum(len(core) for domain in topology for core in domain)
+    return '%d Domains, %d Cores, %d CPUs' % (len(topology), cores, cpus)
 
 def build_runner_command(config, dev_cmd, base_cmd, scale_factor, timestamp, runner_idx):
 
@@ -1259,7 +1915,12 @@ def build_runner_command(config, dev_cmd, base_cmd, scale_factor, timestamp, run
 
     return MatchRunner.executable(config) + flags
 
-def run_and_parse_runner(config, command, runner_idx, results_queue, abort_flag):
+def run_and_parse_runner(config, command, runner_idx, channel, abort_flag, cpus=None):
+
+    # Pin this thread first, since the runner and its engines inherit its affinity
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+        print('\n[#%d] Pinned to CPUs %s' % (runner_idx, ','.join(map(str, sorted(cpus)))))
 
     print('\n[#%d] Launching match runner...\n%s\n' % (runner_idx, command))
     runner = Popen(command.split(), stdout=PIPE)
@@ -1275,34 +1936,32 @@ def run_and_parse_runner(config, command, runner_idx, results_queue, abort_flag)
         'illegals'    : 0,               # " illegal move "
     }
 
-    while True:
-
-        # Read each line of output until the pipe closes and we get "" back
-        line = runner.stdout.readline().strip().decode('ascii')
-        if not line:
-            break
+    # Read each line of output until the pipe closes
+    for line in runner.stdout:
 
         if abort_flag.is_set():
             break
 
-        if 'Started game' not in line and 'Score of' not in line:
-            print('[#%d] %s' % (runner_idx, line))
+        # Only finished games are decoded, as the only lines which are parsed
+        if b'Finished game' not in line:
 
-        if 'Finished game' in line:
-            MatchRunner.update_results(results, line)
+            # Anything else of interest, like warnings, is echoed as raw bytes
+            if b'Started game' not in line and b'Score of' not in line:
+                sys.stdout.flush()
+                sys.stdout.buffer.write(b'[#%d] %s\n' % (runner_idx, line.strip()))
+                sys.stdout.buffer.flush()
 
-        # Add to the results queue every time we have a game-pair finished
+            continue
+
+        line = line.strip().decode('ascii')
+        print('[#%d] %s' % (runner_idx, line))
+
+        MatchRunner.update_results(results, line)
+
+        # Add to the results channel every time we have a game-pair finished
         if any(results['pentanomial']):
 
-            # Place the results into the Queue, and be sure to copy the lists
-            results_queue.put({
-                'trinomial'     : list(results['trinomial']),
-                'pentanomial'   : list(results['pentanomial']),
-                'crashes'       : results['crashes'],
-                'timelosses'    : results['timelosses'],
-                'illegals'      : results['illegals'],
-                'runner_idx'    : runner_idx,
-            })
+            channel.put(runner_idx, results)
 
             # Clear out all the results, so we can start collecting a new set
             results['trinomial'  ] = [0, 0, 0]
@@ -1338,13 +1997,21 @@ def parse_arguments(client_args):
     )
 
     # Arguments specific to worker.py
-    p.add_argument('-T', '--threads' , help='Total Threads'               , required=True      )
-    p.add_argument('-N', '--nsockets', help='Number of Sockets'           , required=True      )
-    p.add_argument('-I', '--identity', help='Machine pseudonym'           , required=False     )
-    p.add_argument(      '--syzygy'  , help='Syzygy WDL'                  , required=False     )
-    p.add_argument(      '--fleet'   , help='Fleet Mode'                  , action='store_true')
-    p.add_argument(      '--noisy'   , help='Reject time-based workloads' , action='store_true')
-    p.add_argument(      '--focus'   , help='Prefer certain engine(s)'    , nargs='+'          )
+    p.add_argument('-T', '--threads'       , help='Total Threads'               , required=True      )
+    p.add_argument('-N', '--nsockets'      , help='Number of Sockets'           , required=True      )
+    p.add_argument('-I', '--identity'      , help='Machine pseudonym'           , required=False     )
+    p.add_argument(      '--syzygy'        , help='Syzygy WDL'                  , required=False     )
+    p.add_argument(      '--fleet'         , help='Fleet Mode'                  , action='store_true')
+    p.add_argument(      '--noisy'         , help='Reject time-based workloads' , action='store_true')
+    p.add_argument(      '--focus'         , help='Prefer certain engine(s)'    , nargs='+'          )
+    p.add_argument(      '--build-cache'   , help='Host-wide engine build cache', default=BUILD_CACHE)
+    p.add_argument(      '--no-build-cache', help='Disable the build cache'     , action='store_true')
+    p.add_argument(      '--ccache'        , help='Compile engines via ccache'  , action='store_true')
+    p.add_argument(      '--share-binaries', help='Share engine binaries'       , action='store_true')
+    p.add_argument(      '--bench-samples' , help='Interleaved bench samples'   , default=1          )
+    p.add_argument(      '--pin-cores'     , help='Pin benches and runners'     , action='store_true')
+    p.add_argument(      '--cache-budget'  , help='MB for cached artifacts'     , default=ARTIFACT_BUDGET)
+    p.add_argument(      '--via-relay'     , help='URL of a client.py --relay'  , required=False     )
 
     # Ignore unknown arguments ( from client )
     worker_args, unknown = p.parse_known_args()
@@ -1382,13 +2049,21 @@ def run_openbench_worker(client_args):
 
         try:
             # Cleanup on each workload request
-            cleanup_client()
+            cleanup_client(config)
+
+            # Deliver any results left over from an earlier Workload or session. Until
+            # then, a new Workload could send later batches, which would shadow them
+            if not ResultsJournal.replay(config):
+                time.sleep(TIMEOUT_ERROR)
+                continue
 
             # Keep asking for a workload until we get a response
             try_forever(server_request_workload, [config], connection_error)
 
-            # Complete the workload if there was work to be done
-            if config.workload: complete_workload(config)
+            # Complete the workload if there was work to be done, with its artifacts pinned
+            if config.workload:
+                with ArtifactCache.pinned(workload_artifacts(config)):
+                    complete_workload(config)
 
             # Otherwise --fleet workers will exit when there is no work
             elif config.fleet: time.sleep(TIMEOUT_ERROR); sys.exit()
@@ -27,3 +27,4 @@ django.contrib.admin.site.register(OpenBench.models.Result)
 django.contrib.admin.site.register(OpenBench.models.Test)
 django.contrib.admin.site.register(OpenBench.models.LogEvent)
 django.contrib.admin.site.register(OpenBench.models.Network)
+django.contrib.admin.site.register(OpenBench.models.Binary)
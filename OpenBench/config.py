@@ -112,6 +112,11 @@ def verify_general_config(conf):
     assert type(conf.get('require_login_to_view'      ) == bool)
     assert type(conf.get('require_manual_registration') == bool)
     assert type(conf.get('balance_engine_throughputs' ) == bool)
+    assert type(conf.get('share_engine_binaries'      ) == bool)
+    assert type(conf.get('extract_training_data'      ) == bool)
+
+    # Networks may be sent by the web server, rather than by Django
+    assert conf.get('network_offload', '') in ('', 'X-Sendfile', 'X-Accel-Redirect')
 
 def verify_engine_basics(conf):
 
@@ -0,0 +1,76 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                                                                             #
+#   OpenBench is a chess engine testing framework authored by Andrew Grant.   #
+#   <https://github.com/AndyGrant/OpenBench>           <andrew@grantnet.us>   #
+#                                                                             #
+#   OpenBench is free software: you can redistribute it and/or modify         #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation, either version 3 of the License, or         #
+#   (at your option) any later version.                                       #
+#                                                                             #
+#   OpenBench is distributed in the hope that it will be useful,              #
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#   GNU General Public License for more details.                              #
+#                                                                             #
+#   You should have received a copy of the GNU General Public License         #
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.     #
+#                                                                             #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+import io
+import zlib
+
+from django.conf import settings
+from django.http import JsonResponse
+
+# Only endpoints which workers report to, via ServerReporter, may send gzip bodies
+GZIP_ENDPOINTS = (
+    '/clientBenchError/', '/clientHeartbeat/', '/clientSubmitError/',
+    '/clientSubmitNPS/', '/clientSubmitPGN/', '/clientSubmitResultsBatch/',
+)
+
+# Refuse anything inflating beyond what Django would accept uncompressed
+GZIP_MAX_INFLATED_SIZE = settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 2621440
+
+class GzipRequestMiddleware:
+
+    ## Transparently inflates request bodies sent with "Content-Encoding: gzip", so that
+    ## request.POST and request.FILES behave as usual. Must precede anything that reads
+    ## the body, which includes the CSRF middleware.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        if request.META.get('HTTP_CONTENT_ENCODING', '').lower() != 'gzip':
+            return self.get_response(request)
+
+        if request.path_info not in GZIP_ENDPOINTS:
+            return JsonResponse({ 'error' : 'Compressed request bodies are not accepted here' }, status=415)
+
+        try: # Never read more than the inflated body itself could be
+            if int(request.META.get('CONTENT_LENGTH') or 0) > GZIP_MAX_INFLATED_SIZE:
+                return JsonResponse({ 'error' : 'Compressed request body is too large' }, status=413)
+
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data     = inflater.decompress(request.read(GZIP_MAX_INFLATED_SIZE), GZIP_MAX_INFLATED_SIZE)
+
+            if inflater.unconsumed_tail:
+                return JsonResponse({ 'error' : 'Compressed request body is too large' }, status=413)
+
+            if not inflater.eof:
+                return JsonResponse({ 'error' : 'Compressed request body is truncated' }, status=400)
+
+        except (ValueError, zlib.error):
+            return JsonResponse({ 'error' : 'Malformed gzip request body' }, status=400)
+
+        # Swap in the inflated stream, and correct the headers to match it
+        request._stream = io.BytesIO(data)
+        request._read_started = False
+        request.META['CONTENT_LENGTH'] = str(len(data))
+        del request.META['HTTP_CONTENT_ENCODING']
+
+        return self.get_response(request)
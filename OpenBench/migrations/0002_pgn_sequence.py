@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OpenBench', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pgn',
+            name='sequence',
+            field=models.IntegerField(default=0),
+        ),
+    ]
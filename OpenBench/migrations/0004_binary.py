@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OpenBench', '0003_result_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Binary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('engine', models.CharField(max_length=64)),
+                ('sha', models.CharField(max_length=64)),
+                ('network', models.CharField(blank=True, max_length=64)),
+                ('compiler', models.CharField(max_length=64)),
+                ('tier', models.CharField(max_length=512)),
+                ('os_name', models.CharField(max_length=32)),
+                ('sha256', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('machine_id', models.IntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-19 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OpenBench', '0004_binary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='machine',
+            name='base_nps_ci',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='dev_nps_ci',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.1 on 2026-10-19 20:16
+
+import numpy
+
+from django.db import migrations, models
+
+def pack_spsa_parameters(apps, schema_editor):
+
+    # Move the current value of each parameter out of the JSON, in the order of its
+    # keys, and record the bounds alongside. 0007 records that order as spsa_names
+    Test = apps.get_model('OpenBench', 'Test')
+
+    for test in Test.objects.filter(test_mode='SPSA'):
+        params = list(test.spsa['parameters'].values())
+        test.spsa_values = numpy.array([x['value'] for x in params], dtype='<f8').tobytes()
+        test.spsa_bounds = numpy.array([x['min'] for x in params] + [x['max'] for x in params], dtype='<f8').tobytes()
+        test.max_games   = 2 * test.spsa['pairs_per'] * test.spsa['iterations']
+        test.save(update_fields=['spsa_values', 'spsa_bounds', 'max_games'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OpenBench', '0005_machine_nps_ci'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='spsa_bounds',
+            field=models.BinaryField(blank=True, default=bytes),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='spsa_values',
+            field=models.BinaryField(blank=True, default=bytes),
+        ),
+        migrations.RunPython(pack_spsa_parameters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-19 20:26
+
+from django.db import migrations, models
+
+def record_spsa_names(apps, schema_editor):
+
+    # 0006 packed the parameters in the order their keys were read back from the
+    # database, which is stable for a given backend, so record exactly that order
+    Test = apps.get_model('OpenBench', 'Test')
+
+    for test in Test.objects.filter(test_mode='SPSA'):
+        test.spsa_names = list(test.spsa['parameters'].keys())
+        test.save(update_fields=['spsa_names'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OpenBench', '0006_test_spsa_values'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='spsa_names',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(record_spsa_names, migrations.RunPython.noop),
+    ]
@@ -17,8 +17,9 @@ def network_delete(network) -> (str, bool):
     status = 'Deleted %s for %s' % (network.name, network.engine)
     sha256 = network.sha256; network.delete()
 
-    # Only delete the actual file if no other engines use it
+    # Only delete the actual file, and any compressed variant, if no other engines use it
     if not Network.objects.filter(sha256=sha256):
         FileSystemStorage().delete(sha256)
+        FileSystemStorage().delete(sha256 + '.xz')
 
     return status, True
\ No newline at end of file
@@ -19,7 +19,7 @@
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 from django.db.models import CharField, IntegerField, BigIntegerField, BooleanField, FloatField
-from django.db.models import JSONField, ForeignKey, DateTimeField, OneToOneField
+from django.db.models import JSONField, ForeignKey, DateTimeField, OneToOneField, BinaryField
 from django.db.models import CASCADE, PROTECT, Model, TextChoices
 from django.contrib.auth.models import User
 
@@ -49,14 +49,16 @@ class Profile(Model):
 
 class Machine(Model):
 
-    user      = ForeignKey(User, PROTECT, related_name='owner')
-    mnps      = FloatField(default=0.00)
-    dev_mnps  = FloatField(default=0.00)
-    base_mnps = FloatField(default=0.00)
-    updated   = DateTimeField(auto_now=True)
-    secret    = CharField(max_length=64, default='None')
-    info      = JSONField()
-    workload  = IntegerField(default=0)
+    user        = ForeignKey(User, PROTECT, related_name='owner')
+    mnps        = FloatField(default=0.00)
+    dev_mnps    = FloatField(default=0.00)
+    base_mnps   = FloatField(default=0.00)
+    dev_nps_ci  = FloatField(default=0.00) # Relative 95% confidence of dev_mnps, if known
+    base_nps_ci = FloatField(default=0.00) # Relative 95% confidence of base_mnps, if known
+    updated     = DateTimeField(auto_now=True)
+    secret      = CharField(max_length=64, default='None')
+    info        = JSONField()
+    workload    = IntegerField(default=0)
 
     def __str__(self):
         return '[%d] %s' % (self.id, self.user.username)
@@ -84,6 +86,9 @@ class Result(Model):
     crashes  = IntegerField(default=0)
     timeloss = IntegerField(default=0)
 
+    # Last results batch applied, to discard any that are resent
+    sequence = IntegerField(default=0)
+
     def __str__(self):
         return '{0} {1}'.format(self.test.dev.name, self.machine.__str__())
 
@@ -144,8 +149,11 @@ class Test(Model):
     lowerllr      = FloatField(default=0.0) # SPRT
     currentllr    = FloatField(default=0.0) # SPRT
     upperllr      = FloatField(default=0.0) # SPRT
-    max_games     = IntegerField(default=0) # GAMES or DATAGEN
+    max_games     = IntegerField(default=0) # GAMES, SPSA, or DATAGEN
     spsa          = JSONField(default=dict, blank=True, null=True) # SPSA
+    spsa_names    = JSONField(default=list, blank=True) # SPSA, the order of spsa_values and spsa_bounds
+    spsa_values   = BinaryField(default=bytes, blank=True) # SPSA, as per OpenBench.utils.spsa_pack()
+    spsa_bounds   = BinaryField(default=bytes, blank=True) # SPSA, as per OpenBench.utils.spsa_pack()
     genfens_args  = CharField(max_length=256, default='', blank=True) # DATAGEN
     play_reverses = BooleanField(default=False) # DATAGEN
 
@@ -222,15 +230,40 @@ class Network(Model):
     def __str__(self):
         return '[{}] {} ({})'.format(self.engine, self.name, self.sha256)
 
+class Binary(Model):
+
+    # Identifies a build, such that any Worker matching all of these may use it
+    engine     = CharField(max_length=64)
+    sha        = CharField(max_length=64)   # Commit sha of the engine source
+    network    = CharField(max_length=64, blank=True)
+    compiler   = CharField(max_length=64)   # Compiler, and its version
+    tier       = CharField(max_length=512)  # CPU flags of the building machine
+    os_name    = CharField(max_length=32)
+
+    # The binary itself, stored in /Media/Binaries/<sha256>
+    sha256     = CharField(max_length=64)
+    size       = BigIntegerField(default=0)
+    machine_id = IntegerField(default=0)
+    created    = DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '[{}] {} ({})'.format(self.engine, self.sha[:8], self.sha256[:8])
+
 class PGN(Model):
 
     test_id    = IntegerField(default=0)
     result_id  = IntegerField(default=0)
     book_index = IntegerField(default=0)
+    sequence   = IntegerField(default=0)
     processed  = BooleanField(default=False)
 
     def __str__(self):
         return self.filename()
 
     def filename(self):
-        return '%s.%s.%s.pgn.bz2' % (self.test_id, self.result_id, self.book_index)
+
+        # Workers upload in chunks; the first chunk retains the original name
+        if not self.sequence:
+            return '%s.%s.%s.pgn.bz2' % (self.test_id, self.result_id, self.book_index)
+
+        return '%s.%s.%s-%s.pgn.bz2' % (self.test_id, self.result_id, self.book_index, self.sequence)
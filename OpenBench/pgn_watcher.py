@@ -25,7 +25,9 @@ import threading
 import time
 import traceback
 
-from OpenBench.models import PGN
+from OpenBench.config import OPENBENCH_CONFIG
+from OpenBench.models import PGN, Test
+from OpenBench.training_data import read_training_data
 
 from django.db import transaction, OperationalError
 from django.core.files.base import ContentFile
@@ -37,10 +39,29 @@ class PGNWatcher(threading.Thread):
         self.stop_event = stop_event
         super().__init__(*args, **kwargs)
 
+    def wants_training_data(self, test_id):
+
+        if not OPENBENCH_CONFIG.get('extract_training_data', False):
+            return False
+
+        return Test.objects.filter(pk=test_id, test_mode='DATAGEN').exists()
+
+    def training_data(self, pgn, pgn_path):
+
+        # Failures are logged, but never stop the PGN itself from being archived
+        try: return read_training_data(pgn_path)[1]
+        except Exception:
+            print ('Unable to extract training data from %s' % (pgn.filename()))
+            traceback.print_exc()
+            sys.stdout.flush()
+            return b''
+
     def process_pgn(self, pgn):
 
-        tar_path = FileSystemStorage('Media/PGNs').path('%d.pgn.tar' % (pgn.test_id))
-        pgn_path = FileSystemStorage().path(pgn.filename())
+        tar_path  = FileSystemStorage('Media/PGNs').path('%d.pgn.tar' % (pgn.test_id))
+        data_path = FileSystemStorage('Media/PGNs').path('%d.positions.bin' % (pgn.test_id))
+        pgn_path  = FileSystemStorage().path(pgn.filename())
+        records   = b''
 
         with transaction.atomic():
 
@@ -49,10 +70,23 @@ class PGNWatcher(threading.Thread):
             if not os.path.exists(dir_name):
                 os.makedirs(dir_name)
 
-            # First PGN will create the initial .tar file
+            # First PGN will create the initial .tar file. Appending reads every
+            # member, so a PGN archived before a failure is cheaply found and skipped
             mode = 'a' if os.path.exists(tar_path) else 'w'
             with tarfile.open(tar_path, mode) as tar:
-                tar.add(pgn_path, arcname=pgn.filename())
+
+                if pgn.filename() not in tar.getnames() and os.path.exists(pgn_path):
+
+                    # Optionally, turn DATAGEN games into training data as they arrive
+                    if self.wants_training_data(pgn.test_id):
+                        records = self.training_data(pgn, pgn_path)
+
+                    tar.add(pgn_path, arcname=pgn.filename())
+
+            # Only written once the PGN is archived, so that records are never repeated
+            if records:
+                with open(data_path, 'ab') as fout:
+                    fout.write(records)
 
             # Delete the raw .pgn.bz2 file, and don't process it again
             FileSystemStorage().delete(pgn.filename())
@@ -63,7 +97,7 @@ class PGNWatcher(threading.Thread):
         while not self.stop_event.wait(timeout=15):
 
             try: # Never exit on errors, to keep the watcher alive
-                for pgn in PGN.objects.filter(processed=False):
+                for pgn in PGN.objects.filter(processed=False).order_by('id'):
                     self.process_pgn(pgn)
 
             # Expect the database to be locked sometimes
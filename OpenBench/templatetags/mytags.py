@@ -229,6 +229,7 @@ def spsa_param_digest(workload):
     iteration     = 1 + (workload.games / (workload.spsa['pairs_per'] * 2))
     c_compression = iteration ** workload.spsa['Gamma']
     r_compression = (workload.spsa['A'] + iteration) ** workload.spsa['Alpha']
+    values        = OpenBench.utils.spsa_current_values(workload)
 
     # Maintain the original order, if there was one
     keys = sorted(
@@ -248,7 +249,7 @@ def spsa_param_digest(workload):
 
         digest.append([
             name,
-            '%.4f' % (param['value']),
+            '%.4f' % (values[name]),
             fstr   % (param['start']),
             fstr   % (param['min'  ]),
             fstr   % (param['max'  ]),
@@ -298,10 +299,12 @@ def spsa_optimal_values(workload):
         key=lambda x: workload.spsa['parameters'][x].get('index', -1)
     )
 
-    lines = []
+    lines  = []
+    values = OpenBench.utils.spsa_current_values(workload)
+
     for name in keys:
         param = workload.spsa['parameters'][name]
-        value = param['value'] if param['float'] else round(param['value'])
+        value = values[name] if param['float'] else round(values[name])
         lines.append(', '.join([name, str(value)]))
 
     return '\n'.join(lines)
@@ -0,0 +1,389 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                                                                             #
+#   OpenBench is a chess engine testing framework authored by Andrew Grant.   #
+#   <https://github.com/AndyGrant/OpenBench>           <andrew@grantnet.us>   #
+#                                                                             #
+#   OpenBench is free software: you can redistribute it and/or modify         #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation, either version 3 of the License, or         #
+#   (at your option) any later version.                                       #
+#                                                                             #
+#   OpenBench is distributed in the hope that it will be useful,              #
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#   GNU General Public License for more details.                              #
+#                                                                             #
+#   You should have received a copy of the GNU General Public License         #
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.     #
+#                                                                             #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# Converts the stripped PGNs from DATAGEN workloads into training data. Every
+# move with a score in its comment becomes one 32 byte record, laid out as in
+# the marlinformat used by many engine trainers. All values are little endian.
+#
+#   u64      occupancy   Bit N is set if square N is occupied. A1=0, H8=63
+#   u8[16]   pieces      A nibble per occupied square, in order, low first.
+#                        Bits 0-2: Pawn=0 ... King=5, Rook with castling=6.
+#                        Bit 3: Set for Black pieces
+#   u8       stm_ep      Bit 7: Black to move. Bits 0-6: En-passant, or 64
+#   u8       halfmove    Fifty move counter, capped at 255
+#   u16      fullmove    Fullmove number
+#   i16      score       Centipawns, from White's point of view
+#   u8       result      0 for a Black win, 1 for a Draw, 2 for a White win
+#   u8       unused      Always 0
+#
+# Book moves, mate scores, and moves without a score are not recorded. A game
+# stops producing records at the first move that cannot be replayed.
+#
+# This module must not depend on Django, so that it may be used by Scripts/.
+
+import bz2
+import re
+import struct
+
+POSITION_STRUCT = struct.Struct('<Q16sBBHhBB')
+POSITION_SIZE   = POSITION_STRUCT.size
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+PIECE_CODES  = { 'P' : 0, 'N' : 1, 'B' : 2, 'R' : 3, 'Q' : 4, 'K' : 5 }
+RESULT_CODES = { '0-1' : 0, '1/2-1/2' : 1, '1-0' : 2 }
+
+REGEX_SAN_MOVE  = r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?[+#]?'
+REGEX_SAN_SCORE = r'([+-]?)(\d+(?:\.\d+)?)/\d+'
+REGEX_MOVETEXT  = r'([^\s{}]+)\s*(?:\{([^}]*)\})?'
+
+KNIGHT_STEPS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+KING_STEPS   = [(1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1)]
+BISHOP_RAYS  = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+ROOK_RAYS    = [(1, 0), (0, -1), (-1, 0), (0, 1)]
+
+def square_name(sq):
+    return 'abcdefgh'[sq % 8] + str(sq // 8 + 1)
+
+def square_index(name):
+    return 'abcdefgh'.index(name[0]) + 8 * (int(name[1]) - 1)
+
+def is_white(piece):
+    return piece.isupper()
+
+class Position(object):
+
+    ## A minimal board, able only to replay SAN moves from a FEN. Castling rights
+    ## are held as the squares of the Rooks that may still castle, to support FRC
+
+    def __init__(self, fen=START_FEN):
+
+        placement, stm, castling, ep, *clocks = fen.split()
+
+        self.board = []
+        for rank in reversed(placement.split('/')):
+            for char in rank:
+                self.board.extend('.' * int(char) if char.isdigit() else char)
+
+        self.white    = stm == 'w'
+        self.ep       = None if ep == '-' else square_index(ep)
+        self.halfmove = int(clocks[0]) if len(clocks) > 0 else 0
+        self.fullmove = int(clocks[1]) if len(clocks) > 1 else 1
+        self.castling = set()
+
+        for char in castling.replace('-', ''):
+            self.castling.add(self.castling_rook(char))
+
+    def castling_rook(self, char):
+
+        rank  = 0 if char.isupper() else 56
+        rook  = 'R' if char.isupper() else 'r'
+        king  = self.board.index('K' if char.isupper() else 'k', rank, rank + 8) - rank
+        files = range(8) if char.upper() == 'Q' else range(7, -1, -1)
+
+        # Shredder-FEN and X-FEN name the file of the Rook
+        if char.upper() not in 'KQ':
+            return rank + 'abcdefgh'.index(char.lower())
+
+        # Otherwise, the outermost Rook on the given side of the King
+        for file in files:
+            if self.board[rank + file] == rook and (file < king) == (char.upper() == 'Q'):
+                return rank + file
+
+        raise ValueError('No Rook for castling right %s' % (char))
+
+    def attackers(self, sq, steps, slides):
+
+        # Search outwards from sq, for any of the given pieces
+        file, rank = sq % 8, sq // 8
+        for df, dr in steps:
+            f, r = file + df, rank + dr
+            while 0 <= f < 8 and 0 <= r < 8:
+                if (found := self.board[f + 8 * r]) != '.':
+                    yield f + 8 * r, found
+                    break
+                if not slides:
+                    break
+                f, r = f + df, r + dr
+
+    def attacked(self, sq, by_white):
+
+        pawn, knight, bishop, rook, queen, king = 'PNBRQK' if by_white else 'pnbrqk'
+
+        # Pawns capture towards the side that they are moving to
+        rank = sq // 8 - (1 if by_white else -1)
+        for file in (sq % 8 - 1, sq % 8 + 1):
+            if 0 <= file < 8 and 0 <= rank < 8 and self.board[file + 8 * rank] == pawn:
+                return True
+
+        return any(x == knight for _, x in self.attackers(sq, KNIGHT_STEPS, False)) \
+            or any(x == king   for _, x in self.attackers(sq, KING_STEPS,   False)) \
+            or any(x in (bishop, queen) for _, x in self.attackers(sq, BISHOP_RAYS, True)) \
+            or any(x in (rook,   queen) for _, x in self.attackers(sq, ROOK_RAYS,   True))
+
+    def leaves_king_safe(self, src, dst):
+
+        board = self.board[:]
+        if self.board[src] in 'Pp' and dst == self.ep:
+            self.board[dst - 8 if self.white else dst + 8] = '.'
+        self.board[dst], self.board[src] = self.board[src], '.'
+
+        king = self.board.index('K' if self.white else 'k')
+        safe = not self.attacked(king, not self.white)
+
+        self.board = board
+        return safe
+
+    def pawn_origins(self, dst, from_file, capture):
+
+        pawn, step = ('P', 8) if self.white else ('p', -8)
+
+        if capture:
+            src = from_file + 8 * (dst // 8) - step
+            return [src] if 0 <= src < 64 and self.board[src] == pawn else []
+
+        if self.board[dst - step] == pawn:
+            return [dst - step]
+
+        double = dst // 8 == (3 if self.white else 4)
+        if double and self.board[dst - step] == '.' and self.board[dst - 2 * step] == pawn:
+            return [dst - 2 * step]
+
+        return []
+
+    def piece_origins(self, piece, dst):
+
+        steps, slides = {
+            'N' : (KNIGHT_STEPS, False), 'B' : (BISHOP_RAYS, True),
+            'R' : (ROOK_RAYS, True),     'Q' : (BISHOP_RAYS + ROOK_RAYS, True),
+            'K' : (KING_STEPS, False),
+        }[piece]
+
+        # Pieces move symmetrically, so look outwards from the destination
+        target = piece if self.white else piece.lower()
+        return [sq for sq, found in self.attackers(dst, steps, slides) if found == target]
+
+    def play_san(self, san):
+
+        if san.rstrip('+#') in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+            return self.play_castle(san.rstrip('+#').count('-') == 1)
+
+        if not (match := re.fullmatch(REGEX_SAN_MOVE, san)):
+            raise ValueError('Unable to parse %s' % (san))
+
+        piece, from_file, from_rank, dst, promo = match.groups()
+        dst       = square_index(dst)
+        from_file = 'abcdefgh'.index(from_file) if from_file else None
+        from_rank = int(from_rank) - 1 if from_rank else None
+
+        if piece:
+            origins = self.piece_origins(piece, dst)
+        else:
+            origins = self.pawn_origins(dst, from_file, from_file not in (None, dst % 8))
+
+        # Disambiguation only ever considers legal moves
+        origins = [x for x in origins if from_file in (None, x % 8) and from_rank in (None, x // 8)]
+        if len(origins) > 1:
+            origins = [x for x in origins if self.leaves_king_safe(x, dst)]
+
+        if len(origins) != 1:
+            raise ValueError('Unable to play %s' % (san))
+
+        self.play_move(origins[0], dst, promo)
+
+    def play_move(self, src, dst, promo):
+
+        moving  = self.board[src]
+        capture = self.board[dst] != '.'
+
+        # En-passant removes a Pawn other than the one on the destination
+        if moving in 'Pp' and dst == self.ep:
+            self.board[dst - 8 if self.white else dst + 8] = '.'
+            capture = True
+
+        self.board[src] = '.'
+        self.board[dst] = (promo if self.white else promo.lower()) if promo else moving
+
+        # Moving the King or a Rook, or capturing a Rook, may forfeit castling
+        if moving in 'Kk':
+            self.castling = { x for x in self.castling if x // 8 != src // 8 }
+        self.castling.discard(src)
+        self.castling.discard(dst)
+
+        # Only record an en-passant square when a Pawn is able to capture there
+        self.ep = None
+        if moving in 'Pp' and abs(dst - src) == 16:
+            enemy = 'p' if self.white else 'P'
+            sides = [dst - 1] * (dst % 8 > 0) + [dst + 1] * (dst % 8 < 7)
+            if any(self.board[x] == enemy for x in sides):
+                self.ep = (src + dst) // 2
+
+        self.halfmove = 0 if capture or moving in 'Pp' else self.halfmove + 1
+        self.end_turn()
+
+    def play_castle(self, kingside):
+
+        rank = 0 if self.white else 56
+        king = self.board.index('K' if self.white else 'k', rank, rank + 8)
+        rook = [x for x in self.castling if x // 8 == rank // 8 and (x > king) == kingside]
+
+        if not rook:
+            raise ValueError('Unable to castle %s' % ('kingside' if kingside else 'queenside'))
+
+        # Clear both first, since FRC may swap or overlap the squares
+        self.board[king] = self.board[rook[0]] = '.'
+        self.board[rank + (6 if kingside else 2)] = 'K' if self.white else 'k'
+        self.board[rank + (5 if kingside else 3)] = 'R' if self.white else 'r'
+
+        self.castling = { x for x in self.castling if x // 8 != rank // 8 }
+        self.ep       = None
+        self.halfmove = self.halfmove + 1
+        self.end_turn()
+
+    def end_turn(self):
+        self.fullmove += not self.white
+        self.white     = not self.white
+
+    def fen(self):
+
+        ranks = []
+        for rank in range(7, -1, -1):
+            row = ''.join(self.board[8 * rank : 8 * rank + 8])
+            ranks.append(re.sub(r'\.+', lambda x: str(len(x.group(0))), row))
+
+        # Standard castling letters, which are only ambiguous for unusual FRC positions
+        castling = ''
+        for sq in sorted(self.castling, key=lambda x: (x >= 8, -x)):
+            king = self.board.index('K' if sq < 8 else 'k', sq - sq % 8, sq - sq % 8 + 8)
+            castling += ('K' if sq > king else 'Q') if sq < 8 else ('k' if sq > king else 'q')
+
+        return '%s %s %s %s %d %d' % ('/'.join(ranks), 'w' if self.white else 'b', castling or '-',
+            square_name(self.ep) if self.ep is not None else '-', self.halfmove, self.fullmove)
+
+    def pack(self, score, result):
+
+        occupancy, nibbles = 0, []
+        for sq, piece in enumerate(self.board):
+            if piece != '.':
+                code = 6 if sq in self.castling else PIECE_CODES[piece.upper()]
+                occupancy |= 1 << sq
+                nibbles.append(code | (0 if is_white(piece) else 8))
+
+        nibbles += [0] * (32 - len(nibbles))
+        pieces   = bytes(nibbles[x] | (nibbles[x+1] << 4) for x in range(0, 32, 2))
+        stm_ep   = (0 if self.white else 128) | (64 if self.ep is None else self.ep)
+
+        return POSITION_STRUCT.pack(occupancy, pieces, stm_ep,
+            min(self.halfmove, 255), min(self.fullmove, 65535), score, result, 0)
+
+def unpack_position(record):
+
+    ## Inverse of Position.pack(), returning the (fen, score, result) of a record
+
+    occupancy, pieces, stm_ep, halfmove, fullmove, score, result, _ = POSITION_STRUCT.unpack(record)
+
+    position = Position('8/8/8/8/8/8/8/8 w - - 0 1')
+    nibbles  = [x for byte in pieces for x in (byte & 15, byte >> 4)]
+
+    for sq in (x for x in range(64) if occupancy >> x & 1):
+        code  = nibbles.pop(0)
+        piece = 'PNBRQKR'[code & 7]
+        position.board[sq] = piece.lower() if code & 8 else piece
+        if code & 7 == 6:
+            position.castling.add(sq)
+
+    position.white    = not stm_ep & 128
+    position.ep       = None if stm_ep & 127 == 64 else stm_ep & 127
+    position.halfmove = halfmove
+    position.fullmove = fullmove
+
+    return position.fen(), score, result
+
+def comment_score(comment):
+
+    # Scores are in pawns, from the point of view of the side to move
+    if not comment or not (match := re.match(REGEX_SAN_SCORE, comment.strip())):
+        return None
+
+    score = round(float(match.group(2)) * 100) * (-1 if match.group(1) == '-' else 1)
+    return score if -32768 < score < 32768 else None
+
+def game_positions(headers, movetext):
+
+    ## Yields a packed record for each scored move. Raises ValueError when a move
+    ## cannot be replayed, after yielding every record that came before it
+
+    if (result := RESULT_CODES.get(headers.get('Result'))) is None:
+        return
+
+    position = Position(headers.get('FEN', START_FEN))
+
+    for token, comment in re.findall(REGEX_MOVETEXT, movetext):
+
+        # Move numbers and the result are not moves
+        if re.fullmatch(r'\d+\.+|1-0|0-1|1/2-1/2|\*', token):
+            continue
+
+        if (score := comment_score(comment)) is not None:
+            yield position.pack(score if position.white else -score, result)
+
+        position.play_san(token)
+
+def pgn_games(stream):
+
+    # Each game is a block of headers, then a block of moves, separated by blank lines
+    while True:
+        header_lines = list(iter(lambda: stream.readline().strip(), ''))
+        move_lines   = list(iter(lambda: stream.readline().strip(), ''))
+        if not header_lines or not move_lines:
+            break
+
+        headers = dict(re.findall(r'\[(\w+) "([^"]*)"\]', ' '.join(header_lines)))
+        yield headers, ' '.join(move_lines)
+
+def read_training_data(pgn_path):
+
+    ## Returns the number of games in a .pgn.bz2 file, and the bytes of all of their
+    ## records. Raises on unreadable files, like a truncated upload, having written nothing
+
+    games, records = 0, []
+
+    with bz2.open(pgn_path, 'rt') as pgn:
+        for headers, movetext in pgn_games(pgn):
+            games += 1
+            try:
+                for record in game_positions(headers, movetext):
+                    records.append(record)
+            except ValueError:
+                pass
+
+    return games, b''.join(records)
+
+def extract_training_data(pgn_path, out_path):
+
+    ## Appends every record from a .pgn.bz2 file to out_path. Returns the number of
+    ## games read, and the number of records written
+
+    games, records = read_training_data(pgn_path)
+
+    with open(out_path, 'ab') as fout:
+        fout.write(records)
+
+    return games, len(records) // POSITION_SIZE
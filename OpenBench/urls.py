@@ -64,10 +64,13 @@ urlpatterns = [
     django.urls.path(r'clientWorkerInfo/', OpenBench.views.client_worker_info),
     django.urls.path(r'clientGetWorkload/', OpenBench.views.client_get_workload),
     django.urls.path(r'clientGetNetwork/<str:engine>/<str:name>/', OpenBench.views.client_get_network),
+    django.urls.path(r'clientFindBinary/', OpenBench.views.client_find_binary),
+    django.urls.path(r'clientGetBinary/', OpenBench.views.client_get_binary),
+    django.urls.path(r'clientSubmitBinary/', OpenBench.views.client_submit_binary),
     django.urls.path(r'clientBenchError/', OpenBench.views.client_bench_error),
     django.urls.path(r'clientSubmitNPS/', OpenBench.views.client_submit_nps),
     django.urls.path(r'clientSubmitError/', OpenBench.views.client_submit_error),
-    django.urls.path(r'clientSubmitResults/', OpenBench.views.client_submit_results),
+    django.urls.path(r'clientSubmitResultsBatch/', OpenBench.views.client_submit_results_batch),
     django.urls.path(r'clientHeartbeat/', OpenBench.views.client_heartbeat),
     django.urls.path(r'clientSubmitPGN/', OpenBench.views.client_submit_pgn),
 
@@ -79,6 +82,7 @@ urlpatterns = [
     django.urls.path(r'api/networks/<str:engine>/<str:identifier>/delete/', OpenBench.views.api_network_delete),
     django.urls.path(r'api/buildinfo/', OpenBench.views.api_build_info),
     django.urls.path(r'api/pgns/<int:pgn_id>/', OpenBench.views.api_pgns),
+    django.urls.path(r'api/training_data/<int:pgn_id>/', OpenBench.views.api_training_data),
 
     # Redirect anything else to the Index
     django.urls.path(r'', OpenBench.views.index),
@@ -21,22 +21,25 @@
 import datetime
 import hashlib
 import json
+import lzma
 import math
+import numpy
 import os
 import random
 import re
 import requests
+import tempfile
+import time
 
 from django.contrib.auth import authenticate
 from django.core.files.base import ContentFile
 from django.core.files.storage import FileSystemStorage
 from django.db import transaction
 from django.db.models import F
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse
 from django.utils import timezone
-from wsgiref.util import FileWrapper
 
-from OpenSite.settings import MEDIA_ROOT, PROJECT_PATH
+from OpenSite.settings import MEDIA_ROOT, MEDIA_URL, PROJECT_PATH
 
 from OpenBench.config import OPENBENCH_CONFIG
 from OpenBench.models import *
@@ -46,6 +49,21 @@ from OpenBench.stats import TrinomialSPRT, PentanomialSPRT
 import OpenBench.views
 import OpenBench.model_utils
 
+REPORT_INTERVAL_MIN = 15  # Seconds between reports, for tests about to be decided
+REPORT_INTERVAL     = 30  # Seconds between reports, for a lightly loaded server
+REPORT_INTERVAL_MAX = 120 # Seconds between reports, regardless of the server load
+REPORT_FLEET_SIZE   = 64  # Active machines, before report intervals begin to grow
+
+# Machine counts are shared by every report, so only count every so often
+RECENT_MACHINES_CACHE = { 'count' : 0, 'updated' : 0.0 }
+
+RESULTS_BATCH_VERSION = 2 # Format of clientSubmitResultsBatch, shared with the Client
+RESULTS_BATCH_FIELDS  = (
+    'losses', 'draws', 'wins', 'LL', 'LD', 'DD', 'DW', 'WW', 'crashes', 'timelosses', 'illegals'
+)
+
+NETWORK_CHUNK_SIZE = 1024 * 1024 # Bytes per read while hashing, storing, or serving Networks
+NETWORK_XZ_RATIO   = 0.90        # Compressed variants are only kept if at least this much smaller
 
 class TimeControl(object):
 
@@ -190,6 +208,15 @@ def getRecentMachines(minutes=5):
     target = target - datetime.timedelta(minutes=minutes)
     return Machine.objects.filter(updated__gte=target)
 
+def getRecentMachineCount(max_age=60):
+
+    # Avoid a query on every report, by reusing the count for max_age seconds
+    if RECENT_MACHINES_CACHE['updated'] + max_age < time.time():
+        RECENT_MACHINES_CACHE['count'  ] = getRecentMachines().count()
+        RECENT_MACHINES_CACHE['updated'] = time.time()
+
+    return RECENT_MACHINES_CACHE['count']
+
 def getMachineStatus(username=None):
 
     machines = getRecentMachines()
@@ -297,9 +324,12 @@ def network_disambiguate(engine, identifier):
 
 def network_upload(request, engine, name):
 
-    # Extract and process the Network file to produce a SHA
+    # Extract and process the Network file to produce a SHA, without reading it all at once
     netfile = request.FILES['netfile']
-    sha256  = hashlib.sha256(netfile.file.read()).hexdigest()[:8].upper()
+    hasher  = hashlib.sha256()
+    for chunk in netfile.chunks(NETWORK_CHUNK_SIZE):
+        hasher.update(chunk)
+    sha256  = hasher.hexdigest()[:8].upper()
 
     # Rejecct Networks with strange characters
     if not re.match(r'^[a-zA-Z0-9_.-]+$', name):
@@ -317,9 +347,8 @@ def network_upload(request, engine, name):
     if engine not in OPENBENCH_CONFIG['engines'].keys():
         return OpenBench.views.redirect(request, '/networks/', error='No Engine found with matching name')
 
-    # Save the file locally into /Media/ if we don't already have this file
-    if not Network.objects.filter(sha256=sha256):
-        FileSystemStorage().save('%s' % (sha256), netfile)
+    # Files are stored once by content, and shared by every Network referencing them
+    network_store(netfile, sha256)
 
     # Create the Network object mapping to the saved local file
     Network.objects.create(
@@ -348,17 +377,167 @@ def network_delete(request, engine, network):
     else:
         return OpenBench.views.redirect(request, '/networks/%s/' % (engine), error=message)
 
+def network_store(netfile, sha256):
+
+    # Media/<sha256> is only ever written once, and atomically, since the name is the content.
+    # The Network rows with a given sha256 act as the reference count for the file
+
+    path = os.path.join(MEDIA_ROOT, sha256)
+    if os.path.isfile(path):
+        return
+
+    with tempfile.NamedTemporaryFile(dir=MEDIA_ROOT, delete=False) as fout:
+        for chunk in netfile.chunks(NETWORK_CHUNK_SIZE):
+            fout.write(chunk)
+
+    os.chmod(fout.name, 0o644)
+    os.replace(fout.name, path)
+
+    # Media/<sha256>.xz is sent instead, to Workers which ask for it
+    with open(path, 'rb') as fin, tempfile.NamedTemporaryFile(dir=MEDIA_ROOT, delete=False) as fout:
+        compressor = lzma.LZMACompressor(preset=6)
+        while (chunk := fin.read(NETWORK_CHUNK_SIZE)):
+            fout.write(compressor.compress(chunk))
+        fout.write(compressor.flush())
+
+    if os.path.getsize(fout.name) <= NETWORK_XZ_RATIO * os.path.getsize(path):
+        os.chmod(fout.name, 0o644)
+        os.replace(fout.name, path + '.xz')
+
+    else: # Some Networks are already compressed, or have little redundancy
+        os.remove(fout.name)
+
+def network_variant(request, sha256):
+
+    # Returns the path and Content-Encoding to send. Ranges always refer to the plain file
+    path      = os.path.join(MEDIA_ROOT, sha256)
+    encodings = [x.split(';')[0].strip() for x in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')]
+
+    if 'xz' in encodings and 'HTTP_RANGE' not in request.META and os.path.isfile(path + '.xz'):
+        return path + '.xz', 'xz'
+
+    return path, None
+
 def network_download(request, engine, network):
 
-    # Craft the download HTML response
-    netfile  = os.path.join(MEDIA_ROOT, network.sha256)
-    fwrapper = FileWrapper(open(netfile, 'rb'), 8192)
-    response = FileResponse(fwrapper, content_type='application/octet-stream')
+    netfile, encoding = network_variant(request, network.sha256)
+
+    size    = os.path.getsize(netfile)
+    etag    = '"%s-%d%s"' % (network.sha256, size, '-' + encoding if encoding else '')
+    offload = OPENBENCH_CONFIG.get('network_offload', '')
+
+    # Files never change for a given sha256, so a matching ETag is always current
+    if etag in [x.strip() for x in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    # Let the web server send the file, including handling any Range headers
+    if offload:
+        response = HttpResponse(content_type='application/octet-stream')
+        response[offload] = netfile if offload == 'X-Sendfile' else MEDIA_URL + os.path.basename(netfile)
+
+    # Otherwise, workers resume downloads with "Range: bytes=start-" or "bytes=start-end"
+    elif (byte_range := parse_byte_range(request.META.get('HTTP_RANGE', ''), size)) == 'INVALID':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % (size)
+        return response
+
+    # Open-ended ranges are served from an open file, which servers may sendfile() from
+    elif not byte_range or byte_range[1] == size - 1:
+        start, end = byte_range if byte_range else (0, size - 1)
+        fin        = open(netfile, 'rb'); fin.seek(start)
+        response   = FileResponse(fin, content_type='application/octet-stream')
+        response.block_size = NETWORK_CHUNK_SIZE
+
+    else: # Bounded ranges are rare, and so are read out in Python
+        start, end = byte_range
+        response   = FileResponse(file_byte_range(netfile, start, end), content_type='application/octet-stream')
+
+    # Partial content must say which bytes are included
+    if not offload and byte_range:
+        response.status_code      = 206
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+
+    if not offload:
+        response['Content-Length'] = end - start + 1
 
     # Set all headers and return response
     response['Expires'] = (datetime.datetime.utcnow() + datetime.timedelta(days=7)).ctime()
-    response['Content-Length'] = os.path.getsize(netfile)
     response['Content-Disposition'] = 'attachment; filename=' + network.sha256
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    return response
+
+def parse_byte_range(header, size):
+
+    # Returns None for no (or an ignorable) Range, 'INVALID' if unsatisfiable, else (start, end)
+    if not (match := re.fullmatch(r'bytes=(\d+)-(\d*)', header.strip())):
+        return None
+
+    start = int(match.group(1))
+    end   = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+
+    return (start, end) if start <= end else 'INVALID'
+
+def file_byte_range(path, start, end, chunk_size=NETWORK_CHUNK_SIZE):
+
+    with open(path, 'rb') as fin:
+
+        fin.seek(start)
+        remaining = end - start + 1
+
+        while remaining > 0 and (chunk := fin.read(min(chunk_size, remaining))):
+            remaining -= len(chunk)
+            yield chunk
+
+
+# Purely Helper functions for sharing engine Binaries between Workers
+
+BINARY_KEY_FIELDS = ('engine', 'sha', 'network', 'compiler', 'tier', 'os_name')
+
+def binary_key(fields):
+    return { field : fields[field] for field in BINARY_KEY_FIELDS }
+
+def binary_upload(request, machine):
+
+    key    = binary_key(request.POST)
+    binary = request.FILES['binary']
+
+    # Only for public engines, which are otherwise built by every Worker
+    if key['engine'] not in OPENBENCH_CONFIG['engines'] or OPENBENCH_CONFIG['engines'][key['engine']]['private']:
+        return { 'error' : 'No Public Engine found with matching name' }
+
+    # The first upload for a given build is kept
+    if Binary.objects.filter(**key).exists():
+        return {}
+
+    hasher = hashlib.sha256()
+    for chunk in binary.chunks():
+        hasher.update(chunk)
+    sha256 = hasher.hexdigest()
+
+    # Save the file locally into /Media/Binaries/ if we don't already have this file
+    if not Binary.objects.filter(sha256=sha256).exists():
+        binary.seek(0)
+        FileSystemStorage().save(os.path.join('Binaries', sha256), binary)
+
+    Binary.objects.create(**key, sha256=sha256, size=binary.size, machine_id=machine.id)
+    return { 'sha256' : sha256 }
+
+def binary_download(binary):
+
+    binfile  = os.path.join(MEDIA_ROOT, 'Binaries', binary.sha256)
+    response = FileResponse(open(binfile, 'rb'), content_type='application/octet-stream')
+
+    response['Content-Length'] = os.path.getsize(binfile)
+    response['Content-Disposition'] = 'attachment; filename=' + binary.sha256
     return response
 
 def network_edit(request, engine, network):
@@ -400,44 +579,93 @@ def network_edit(request, engine, network):
     return OpenBench.views.redirect(request, '/networks/%s' % (network.engine), status='Applied changes')
 
 
-def update_test(request, machine):
+def spsa_parameter_names(test):
+
+    # Workers refer to SPSA parameters by their index within this list. Kept
+    # apart from Test.spsa, as jsonb columns do not preserve the order of keys
+    return list(test.spsa_names)
+
+def spsa_pack(values):
+
+    # Test.spsa_values and Test.spsa_bounds hold little-endian doubles, ordered
+    # as per spsa_parameter_names(). The bounds are every min, then every max
+    return numpy.asarray(values, dtype='<f8').tobytes()
 
-    # Extract error information
-    crashes    = int(request.POST['crashes'   ])
-    timelosses = int(request.POST['timelosses'])
-    illegals   = int(request.POST['illegals'  ])
+def spsa_unpack(data):
+    return numpy.frombuffer(bytes(data), dtype='<f8')
 
-    # Extract Database information
-    machine_id = int(request.POST['machine_id'])
-    result_id  = int(request.POST['result_id' ])
-    test_id    = int(request.POST['test_id'   ])
+def spsa_initialize(test):
 
-    # Trinomial Implementation
-    losses, draws, wins = map(int, request.POST['trinomial'].split())
-    games = losses + draws + wins
+    # Current values start at their inputs, and the JSON no longer tracks them
+    test.spsa_names = sorted(test.spsa['parameters'], key=lambda x: test.spsa['parameters'][x]['index'])
+    params          = [test.spsa['parameters'][name] for name in test.spsa_names]
 
-    # Pentanomial Implementation
-    LL, LD, DD, DW, WW = map(int, request.POST['pentanomial'].split())
+    test.spsa_values = spsa_pack([x['start'] for x in params])
+    test.spsa_bounds = spsa_pack([x['min'] for x in params] + [x['max'] for x in params])
+    test.max_games   = 2 * test.spsa['pairs_per'] * test.spsa['iterations']
+
+def spsa_current_values(test):
+
+    # Key: Parameter name, Value: Current value as a float
+    return dict(zip(spsa_parameter_names(test), spsa_unpack(test.spsa_values).tolist()))
+
+def update_test(batch, machine):
+
+    # Batch format: { 'version', 'test_id', 'result_id', 'sequence', 'deltas', 'spsa' }, where
+    # each of the deltas is [runner_idx, *RESULTS_BATCH_FIELDS], and 'spsa' is a list of floats
+    # indexed as per spsa_parameter_names(), or None when not an SPSA test. Each batch for a
+    # Result has a new, increasing sequence number, and is applied at most once
+
+    if batch.get('version') != RESULTS_BATCH_VERSION:
+        return { 'error' : 'Unsupported Results Batch Version' }
+
+    deltas = [list(map(int, delta[1:])) for delta in batch['deltas']]
+    if any(len(delta) != len(RESULTS_BATCH_FIELDS) for delta in deltas):
+        return { 'error' : 'Malformed Results Batch' }
+
+    spsa = batch.get('spsa')
+    spsa = list(map(float, spsa)) if spsa is not None else None
+
+    test_id, result_id, sequence = map(int, (batch['test_id'], batch['result_id'], batch['sequence']))
+
+    return apply_results(machine, test_id, result_id, sequence, deltas, spsa)
+
+def apply_results(machine, test_id, result_id, sequence, deltas, spsa):
+
+    # Sum every delta into one, in the order of RESULTS_BATCH_FIELDS
+    totals = { field : sum(delta[x] for delta in deltas) for x, field in enumerate(RESULTS_BATCH_FIELDS) }
+    losses, draws, wins = totals['losses'], totals['draws'], totals['wins']
+    games  = losses + draws + wins
 
     with transaction.atomic():
 
-        test = Test.objects.select_for_update().get(id=test_id)
+        # SPSA parameters are updated through Test.spsa_values, so skip the JSON
+        test   = Test.objects.select_for_update().defer('spsa').get(id=test_id)
+        result = Result.objects.select_for_update().select_related('machine').filter(id=result_id).first()
+
+        # Batches may be replayed by a later session of the same Worker, under a new Machine
+        if not result or result.test_id != test_id or result.machine.user_id != machine.user_id:
+            return { 'error' : 'Results Batch Rejected' }
 
         if test.finished or test.deleted:
             return { 'stop' : True }
 
+        # Already applied, but the Worker never saw our response
+        if sequence <= result.sequence:
+            return { 'next_report_in' : next_report_interval(test) }
+
         test.losses += losses # Trinomial
         test.draws  += draws
         test.wins   += wins
-        test.LL     += LL     # Pentanomial
-        test.LD     += LD
-        test.DD     += DD
-        test.DW     += DW
-        test.WW     += WW
+        test.LL     += totals['LL'] # Pentanomial
+        test.LD     += totals['LD']
+        test.DD     += totals['DD']
+        test.DW     += totals['DW']
+        test.WW     += totals['WW']
         test.games  += games  # Overall
 
         # Consider only Crashes or Illegal moves as real errors
-        test.error = bool(test.error or crashes or illegals)
+        test.error = bool(test.error or totals['crashes'] or totals['illegals'])
 
         if test.test_mode == 'SPRT':
 
@@ -465,12 +693,17 @@ def update_test(request, machine):
 
         elif test.test_mode == 'SPSA':
 
-            # Update each parameter, as determined by the Worker
-            for name, param in test.spsa['parameters'].items():
-                x = param['value'] + float(request.POST['spsa_%s' % (name)])
-                param['value'] = max(param['min'], min(param['max'], x))
+            # Update every parameter at once, as determined by the Worker
+            values = spsa_unpack(test.spsa_values)
+            bounds = spsa_unpack(test.spsa_bounds).reshape(2, -1)
+
+            if spsa is not None and len(spsa) != len(values):
+                return { 'error' : 'Malformed Results Batch' }
+
+            if spsa is not None:
+                test.spsa_values = spsa_pack(numpy.clip(values + spsa, bounds[0], bounds[1]))
 
-            test.finished = test.games >= 2 * test.spsa['pairs_per'] * test.spsa['iterations']
+            test.finished = test.games >= test.max_games
 
         elif test.test_mode == 'DATAGEN':
 
@@ -479,31 +712,47 @@ def update_test(request, machine):
 
         test.save()
 
-    # Update Result object; No risk from concurrent access
-    Result.objects.filter(id=result_id).update(
-        games    = F('games'   ) + games,
-        losses   = F('losses'  ) + losses,
-        draws    = F('draws'   ) + draws,
-        wins     = F('wins'    ) + wins,
-        LL       = F('LL'      ) + LL,
-        LD       = F('LD'      ) + LD,
-        DD       = F('DD'      ) + DD,
-        DW       = F('DW'      ) + DW,
-        WW       = F('WW'      ) + WW,
-        crashes  = F('crashes' ) + crashes,
-        timeloss = F('timeloss') + timelosses,
-        updated  = timezone.now()
-    )
-
-    # Update Profile object; No risk from concurrent access
-    Profile.objects.filter(user=Machine.objects.get(id=machine_id).user).update(
-        games=F('games') + games,
-        updated=timezone.now()
-    )
-
-    # Update Machine object; No risk from concurrent access
-    Machine.objects.filter(id=machine_id).update(
-        updated=timezone.now()
-    )
-
-    return [{}, { 'stop' : True }][test.finished]
+        # Update the Result, Profile, and Machine while still holding the Test
+        Result.objects.filter(id=result_id).update(
+            games    = F('games'   ) + games,
+            losses   = F('losses'  ) + losses,
+            draws    = F('draws'   ) + draws,
+            wins     = F('wins'    ) + wins,
+            LL       = F('LL'      ) + totals['LL'],
+            LD       = F('LD'      ) + totals['LD'],
+            DD       = F('DD'      ) + totals['DD'],
+            DW       = F('DW'      ) + totals['DW'],
+            WW       = F('WW'      ) + totals['WW'],
+            crashes  = F('crashes' ) + totals['crashes'],
+            timeloss = F('timeloss') + totals['timelosses'],
+            sequence = sequence,
+            updated  = timezone.now()
+        )
+
+        Profile.objects.filter(user_id=machine.user_id).update(
+            games=F('games') + games,
+            updated=timezone.now()
+        )
+
+        Machine.objects.filter(id=machine.id).update(
+            updated=timezone.now()
+        )
+
+    if test.finished:
+        return { 'stop' : True }
+
+    return { 'next_report_in' : next_report_interval(test) }
+
+def next_report_interval(test):
+
+    # Grow with the square root of the fleet, so requests scale sub-linearly
+    machines = getRecentMachineCount()
+    interval = REPORT_INTERVAL * max(1.0, math.sqrt(machines / REPORT_FLEET_SIZE))
+
+    # SPRTs report faster near either bound, and slower when far from both
+    if test.test_mode == 'SPRT' and test.upperllr > test.lowerllr:
+        distance = min(test.upperllr - test.currentllr, test.currentllr - test.lowerllr)
+        position = max(0.0, min(1.0, 2 * distance / (test.upperllr - test.lowerllr)))
+        interval = REPORT_INTERVAL_MIN + (2 * interval - REPORT_INTERVAL_MIN) * position
+
+    return int(max(REPORT_INTERVAL_MIN, min(REPORT_INTERVAL_MAX, interval)))
@@ -559,12 +559,23 @@ def scripts(request):
 #                              CLIENT HOOK VIEWS                              #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
+def worker_fields(request):
+
+    # Workers send form data, except for batched reports which are a JSON document
+    if request.content_type != 'application/json':
+        return request.POST
+
+    if not hasattr(request, 'worker_json'):
+        request.worker_json = json.loads(request.body)
+
+    return request.worker_json
+
 def verify_worker(function):
 
     def wrapped_verify_worker(*args, **kwargs):
 
         # Get the machine, assuming it exists
-        try: machine = Machine.objects.get(id=int(args[0].POST['machine_id']))
+        try: machine = Machine.objects.get(id=int(worker_fields(args[0])['machine_id']))
         except: return JsonResponse({ 'error' : 'Bad Machine Id' })
 
         # Ensure the Client is using the same version as the Server
@@ -573,7 +584,7 @@ def verify_worker(function):
             return JsonResponse({ 'error' : 'Bad Client Version: Expected %d' % (expected_ver)})
 
         # Use the secret token as our soft verification
-        if machine.secret != args[0].POST['secret']:
+        if machine.secret != worker_fields(args[0])['secret']:
             return JsonResponse({ 'error' : 'Invalid Secret Token' })
 
         # Prompt the worker to soft-restart if its config is out of date
@@ -690,6 +701,41 @@ def client_get_network(request, engine, name):
 def client_get_workload(request, machine):
     return JsonResponse(get_workload(request, machine))
 
+@csrf_exempt
+@verify_worker
+def client_find_binary(request, machine):
+
+    if not OPENBENCH_CONFIG.get('share_engine_binaries'):
+        return JsonResponse({})
+
+    # Any build of the same engine, source, network, compiler, CPU flags, and OS
+    binary = Binary.objects.filter(**OpenBench.utils.binary_key(request.POST)).first()
+    return JsonResponse({ 'sha256' : binary.sha256, 'size' : binary.size } if binary else {})
+
+@csrf_exempt
+@verify_worker
+def client_get_binary(request, machine):
+
+    binary = Binary.objects.filter(sha256=request.POST['sha256']).first()
+
+    if not OPENBENCH_CONFIG.get('share_engine_binaries') or not binary:
+        return JsonResponse({ 'error' : 'Binary not found' })
+
+    return OpenBench.utils.binary_download(binary)
+
+@csrf_exempt
+@verify_worker
+def client_submit_binary(request, machine):
+
+    if not OPENBENCH_CONFIG.get('share_engine_binaries'):
+        return JsonResponse({})
+
+    # Only enabled users may already run code on other Workers, via their tests
+    if not Profile.objects.filter(user=machine.user, enabled=True).exists():
+        return JsonResponse({})
+
+    return JsonResponse(OpenBench.utils.binary_upload(request, machine))
+
 @csrf_exempt
 @verify_worker
 def client_bench_error(request, machine):
@@ -716,6 +762,10 @@ def client_submit_nps(request, machine):
     machine.mnps      = float(request.POST['nps'     ]) / 1e6;
     machine.dev_mnps  = float(request.POST['dev_nps' ]) / 1e6;
     machine.base_mnps = float(request.POST['base_nps']) / 1e6;
+
+    # Multi-sample benches also report their relative 95% confidence
+    machine.dev_nps_ci  = min(1.0, float(request.POST.get('dev_nps_ci' , 0.0)))
+    machine.base_nps_ci = min(1.0, float(request.POST.get('base_nps_ci', 0.0)))
     machine.save()
 
     # Pass back an empty JSON response
@@ -747,10 +797,10 @@ def client_submit_error(request, machine):
 
 @csrf_exempt
 @verify_worker
-def client_submit_results(request, machine):
+def client_submit_results_batch(request, machine):
 
-    # Returns {}, or { 'stop' : True }
-    return JsonResponse(OpenBench.utils.update_test(request, machine))
+    # Returns { 'next_report_in' : seconds }, or { 'stop' : True }
+    return JsonResponse(OpenBench.utils.update_test(worker_fields(request), machine))
 
 @csrf_exempt
 @verify_worker
@@ -761,7 +811,11 @@ def client_heartbeat(request, machine):
 
     # Include a 'stop' header iff the test was finished
     test = Test.objects.get(id=int(request.POST['test_id']))
-    return JsonResponse([{}, { 'stop' : True }][test.finished])
+    if test.finished:
+        return JsonResponse({ 'stop' : True })
+
+    # Otherwise, suggest when to next hear from the worker
+    return JsonResponse({ 'next_report_in' : OpenBench.utils.next_report_interval(test) })
 
 @csrf_exempt
 @verify_worker
@@ -769,11 +823,18 @@ def client_submit_pgn(request, machine):
 
     with transaction.atomic():
 
-        # Format: test.result.book-index.pgn.bz2
+        # Format: test.result.book-index[-sequence].pgn.bz2
         pgn            = PGN()
         pgn.test_id    = int(request.POST['test_id']   )
         pgn.result_id  = int(request.POST['result_id'] )
         pgn.book_index = int(request.POST['book_index'])
+        pgn.sequence   = int(request.POST['sequence']  )
+
+        # Chunks may be resent if the response was lost. Only keep the first
+        if PGN.objects.filter(test_id=pgn.test_id, result_id=pgn.result_id,
+                              book_index=pgn.book_index, sequence=pgn.sequence).exists():
+            return JsonResponse({})
+
         pgn.save()
 
         # Save the .pgn.bz2 to /Media/
@@ -910,23 +971,30 @@ def api_build_info(request):
 
 @csrf_exempt
 def api_pgns(request, pgn_id):
+    return api_workload_archive(request, pgn_id, '%d.pgn.tar' % (pgn_id), 'PGN')
+
+@csrf_exempt
+def api_training_data(request, pgn_id):
+    return api_workload_archive(request, pgn_id, '%d.positions.bin' % (pgn_id), 'Training Data')
+
+def api_workload_archive(request, pgn_id, filename, label):
 
     # 0. Make sure the request has the correct permissions
     if not api_authenticate(request):
         return api_response({ 'error' : 'API requires authentication for this server' })
 
-    # 1. Make sure the workload actually exists for the requested PGN
+    # 1. Make sure the workload actually exists for the requested archive
     try: workload = Test.objects.get(pk=pgn_id)
     except: return api_response({ 'error' : 'Requested Workload Id does not exist' })
 
-    # 2. Make sure there actually is a PGN attached to the Workload
-    pgn_path = FileSystemStorage('Media/PGNs').path('%d.pgn.tar' % (pgn_id))
-    if not os.path.exists(pgn_path):
-        return api_response({ 'error' : 'Unable to find PGN for Workload #%d' % (pgn_id) })
+    # 2. Make sure there actually is an archive attached to the Workload
+    archive_path = FileSystemStorage('Media/PGNs').path(filename)
+    if not os.path.exists(archive_path):
+        return api_response({ 'error' : 'Unable to find %s for Workload #%d' % (label, pgn_id) })
 
     # 3. Make sure the workload is not currently running
     if not workload.finished:
-        return api_response({ 'error' : 'PGNs cannot be downloaded while the Workload is active' })
+        return api_response({ 'error' : '%s cannot be downloaded while the Workload is active' % (label) })
 
     # 4. Make sure no active workers are still on this workload
     if OpenBench.utils.getRecentMachines().filter(workload=pgn_id):
@@ -937,13 +1005,13 @@ def api_pgns(request, pgn_id):
         return api_response({ 'error' : 'Still processing individual PGNs into the archive. Try again shortly' })
 
     # Craft the download HTML response
-    fwrapper = FileWrapper(open(pgn_path, 'rb'), 8192)
+    fwrapper = FileWrapper(open(archive_path, 'rb'), 8192)
     response = FileResponse(fwrapper, content_type='application/octet-stream')
 
     # Set all headers and return response
     response['Expires'] = -1
-    response['Content-Length'] = os.path.getsize(pgn_path)
-    response['Content-Disposition'] = 'attachment; filename=%d.pgn.tar' % (pgn_id)
+    response['Content-Length'] = os.path.getsize(archive_path)
+    response['Content-Disposition'] = 'attachment; filename=%s' % (filename)
     return response
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -205,6 +205,7 @@ def create_new_tune(request):
 
     test.test_mode        = 'SPSA'
     test.spsa             = extract_spas_params(request)
+    OpenBench.utils.spsa_initialize(test)
 
     test.awaiting         = not dev_has_all
 
@@ -315,7 +316,6 @@ def extract_spas_params(request):
         # Raw extraction
         param['float'] = data_type.strip() == 'float'
         param['start'] = float(value)
-        param['value'] = float(value)
         param['min'  ] = float(minimum)
         param['max'  ] = float(maximum)
         param['c_end'] = float(c_end)
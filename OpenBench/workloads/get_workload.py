@@ -191,7 +191,8 @@ def workload_to_dictionary(test, result, machine):
     workload = {}
 
     workload['result'] = {
-        'id'  : result.id,
+        'id'       : result.id,
+        'sequence' : result.sequence, # Last results batch applied
     }
 
     workload['test'] = {
@@ -286,8 +287,13 @@ def spsa_to_dictionary(test, workload):
     c_compression = iteration ** test.spsa['Gamma']
     r_compression = (test.spsa['A'] + iteration) ** test.spsa['Alpha']
 
+    values = OpenBench.utils.spsa_current_values(test)
+
+    # Workers report back in this order, as they enumerate the parameters
     spsa = {}
-    for name, param in test.spsa['parameters'].items():
+    for name in OpenBench.utils.spsa_parameter_names(test):
+
+        param = test.spsa['parameters'][name]
 
         spsa[name] = {
             'dev'  : [], # One for each Permutation the Worker will run
@@ -303,8 +309,8 @@ def spsa_to_dictionary(test, workload):
 
             # Adjust current best by +- C
             flip = 1 if random.getrandbits(1) else -1
-            dev  = param['value'] + flip * spsa[name]['c']
-            base = param['value'] - flip * spsa[name]['c']
+            dev  = values[name] + flip * spsa[name]['c']
+            base = values[name] - flip * spsa[name]['c']
 
             # Probabilistic rounding for Integer types
             if not param['float']:
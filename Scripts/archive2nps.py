@@ -22,56 +22,108 @@
 
 import argparse
 import bz2
-import io
+import json
 import os
 import re
 import tarfile
 
-def pgn_iterator(content):
+from concurrent.futures import ProcessPoolExecutor
+
+ARCHIVE = None # Opened once per process, by open_archive()
+
+def pgn_iterator(stream):
 
     def pgn_header_list(lines):
         return { f.split()[0][1:] : re.search(r'"([^"]*)"', f).group(1) for f in lines }
 
-    data = io.StringIO(content.decode('utf-8'))
-
     while True:
 
-        headers   = pgn_header_list(iter(lambda: data.readline().rstrip(), ''))
-        move_text = ' '.join(iter(lambda: data.readline().rstrip(), ''))
+        headers   = pgn_header_list(iter(lambda: stream.readline().rstrip(), ''))
+        move_text = ' '.join(iter(lambda: stream.readline().rstrip(), ''))
 
         if not headers or not move_text:
             break
 
         yield (headers, move_text)
 
-def process_content(content, data, result_id, use_scale):
+def process_stream(stream, use_scale):
 
-    comment_regex = r'{(book|[+-]?M?\d+(?:\.\d+)? \d+/\d+ \d+ \d+)[^}]*}'
+    comment_regex = re.compile(r'{(book|[+-]?M?\d+(?:\.\d+)? \d+/\d+ \d+ \d+)[^}]*}')
 
-    for (headers, move_text) in pgn_iterator(content):
+    stats = {} # Partial aggregates for a single archive member
+    for (headers, move_text) in pgn_iterator(stream):
 
         factor    = float(headers['ScaleFactor']) if use_scale else 1.00
         white     = headers['White'].split('-')[-1]
         black     = headers['Black'].split('-')[-1]
         white_stm = 'FEN' not in headers or headers['FEN'].split()[1] == 'w'
 
-        # Setup to track stats per result-id
-        if result_id not in data:
-            data[result_id] = {}
-
-        # Setup to track stats for this result-id
+        # Setup to track stats for each engine
         for engine in (white, black):
-            if engine not in data[result_id]:
-                data[result_id][engine] = { 'nodes' : 0, 'time' : 0, 'games' : 0, 'ply' : 0 }
-            data[result_id][engine]['games'] += 1
+            if engine not in stats:
+                stats[engine] = { 'nodes' : 0, 'time' : 0, 'games' : 0, 'ply' : 0 }
+            stats[engine]['games'] += 1
 
-        for x in re.compile(comment_regex).findall(move_text):
+        for x in comment_regex.findall(move_text):
             if len(tokens := x.split()) == 4:
-                data[result_id][white if white_stm else black]['time']  += int(tokens[2]) / factor
-                data[result_id][white if white_stm else black]['nodes'] += int(tokens[3])
-                data[result_id][white if white_stm else black]['ply']   += 1
+                stats[white if white_stm else black]['time']  += int(tokens[2]) / factor
+                stats[white if white_stm else black]['nodes'] += int(tokens[3])
+                stats[white if white_stm else black]['ply']   += 1
             white_stm = not white_stm
 
+    return stats
+
+def open_archive(filename):
+
+    # TarInfo objects carry their own offsets, so no re-scan is needed later
+    global ARCHIVE
+    ARCHIVE = tarfile.open(filename, 'r')
+
+def process_member(member, use_scale):
+
+    # Decompress while parsing, rather than holding the entire member in memory
+    with bz2.open(ARCHIVE.extractfile(member), 'rt') as stream:
+        return member.name, member.size, process_stream(stream, use_scale)
+
+def process_members(filename, members, use_scale, jobs):
+
+    if jobs <= 1:
+        open_archive(filename)
+        return [process_member(member, use_scale) for member in members]
+
+    # Fan out the members, a few at a time, to each of the processes
+    chunksize = max(1, len(members) // (jobs * 8))
+    with ProcessPoolExecutor(jobs, initializer=open_archive, initargs=(filename,)) as executor:
+        return list(executor.map(process_member, members, [use_scale] * len(members), chunksize=chunksize))
+
+def merge_stats(data, result_id, stats):
+
+    # Setup to track stats per result-id
+    if result_id not in data:
+        data[result_id] = {}
+
+    for engine, values in stats.items():
+        if engine not in data[result_id]:
+            data[result_id][engine] = { 'nodes' : 0, 'time' : 0, 'games' : 0, 'ply' : 0 }
+        for key, value in values.items():
+            data[result_id][engine][key] += value
+
+def load_cache(path):
+
+    try:
+        with open(path) as fin:
+            return json.load(fin)
+
+    except (OSError, ValueError):
+        return { 'scaled' : {}, 'unscaled' : {} }
+
+def save_cache(path, cache):
+
+    # Write then rename, to never leave a partial cache behind
+    with open(path + '.tmp', 'w') as fout:
+        json.dump(cache, fout)
+    os.replace(path + '.tmp', path)
+
 def report_verbose_stats(data):
 
     header = 'Result ID    Games      Dev       Base   '
@@ -126,18 +178,32 @@ if __name__ == '__main__':
     parser.add_argument('filename', help='Path to the OpenBench pgn archive')
     parser.add_argument('--scale' , help='Adjust based on ScaleFactor', action='store_true')
     parser.add_argument('-v', '--verbose', help='Verbose reporting per machine', action='store_true')
+    parser.add_argument('-j', '--jobs', help='Processes to decompress and parse with', type=int, default=1)
+    parser.add_argument('--cache', help='Cache of per-member results. Defaults to <filename>.nps.json')
+    parser.add_argument('--no-cache', help='Process every member, and save nothing', action='store_true')
     args = parser.parse_args()
 
-    data = {}
+    cache_path = args.cache if args.cache else args.filename + '.nps.json'
+    cache      = { 'scaled' : {}, 'unscaled' : {} } if args.no_cache else load_cache(cache_path)
+    cached     = cache['scaled' if args.scale else 'unscaled']
+
     with tarfile.open(args.filename, 'r') as tar:
-        for member in filter(lambda x: x.isfile(), tar.getmembers()):
-            if file := tar.extractfile(member):
-                test_id, result_id, seed, _, _ = member.name.split('.')
-                process_content(bz2.decompress(file.read()), data, result_id, args.scale)
+        members = list(filter(lambda x: x.isfile(), tar.getmembers()))
+
+    # Members are never rewritten in place, so only new ones need processing
+    pending = [x for x in members if cached.get(x.name, {}).get('size') != x.size]
+    for name, size, stats in process_members(args.filename, pending, args.scale, args.jobs):
+        cached[name] = { 'size' : size, 'stats' : stats }
+
+    if pending and not args.no_cache:
+        save_cache(cache_path, cache)
+
+    data = {}
+    for member in members:
+        test_id, result_id, seed, _, _ = member.name.split('.')
+        merge_stats(data, result_id, cached[member.name]['stats'])
 
     if args.verbose:
         report_verbose_stats(data)
 
     report_general_stats(data)
-
-
@@ -22,17 +22,94 @@
 
 import argparse
 import bz2
+import collections
+import sys
 import tarfile
 
+from concurrent.futures import ProcessPoolExecutor
+
+ARCHIVE = None # Opened once per process, by open_archive()
+
+def open_archive(filename):
+
+    # TarInfo objects carry their own offsets, so no re-scan is needed later
+    global ARCHIVE
+    ARCHIVE = tarfile.open(filename, 'r')
+
+def read_member(member, decompress):
+
+    data = ARCHIVE.extractfile(member).read()
+    return bz2.decompress(data) if decompress else data
+
+def ordered_map(executor, func, items, window):
+
+    # Like executor.map(), but only holding a bounded number of results at once
+    pending = collections.deque()
+
+    for item in items:
+        pending.append(executor.submit(func, *item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+def select_compression(args):
+
+    if args.compression:
+        return args.compression
+
+    if args.output and args.output.endswith('.bz2'):
+        return 'bz2'
+
+    if args.output and args.output.endswith(('.zst', '.zstd')):
+        return 'zstd'
+
+    return 'none'
+
+def write_members(fout, filename, members, compression, jobs):
+
+    # Concatenated bz2 streams are themselves a valid bz2 file, so they are copied
+    decompress = compression != 'bz2'
+    items      = [(member, decompress) for member in members]
+
+    if compression == 'zstd':
+        import zstandard # Optional, only needed for .zst outputs
+        fout = zstandard.ZstdCompressor(threads=-1).stream_writer(fout, closefd=False)
+
+    if jobs <= 1:
+        open_archive(filename)
+        for item in items:
+            fout.write(read_member(*item))
+
+    else:
+        with ProcessPoolExecutor(jobs, initializer=open_archive, initargs=(filename,)) as executor:
+            for data in ordered_map(executor, read_member, items, 4 * jobs):
+                fout.write(data)
+
+    if compression == 'zstd':
+        fout.close()
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
     parser.add_argument('archive', help='Path to the OpenBench pgn archive')
+    parser.add_argument('-o', '--output', help='Merged PGN output. Defaults to stdout')
+    parser.add_argument('-j', '--jobs', help='Processes to decompress with', type=int, default=1)
+    parser.add_argument('--compression', help='Output format. Inferred from --output', choices=['none', 'bz2', 'zstd'])
+    parser.add_argument('--result-id', help='Only include games from these Result ids', nargs='+')
     args = parser.parse_args()
 
-    data = {}
     with tarfile.open(args.archive, 'r') as tar:
-        for member in filter(lambda x: x.isfile(), tar.getmembers()):
-            if file := tar.extractfile(member):
-                for line in bz2.decompress(file.read()).decode('utf-8').split('\n'):
-                    print (line)
\ No newline at end of file
+        members = list(filter(lambda x: x.isfile(), tar.getmembers()))
+
+    # Format: test.result.book-index[-sequence].pgn.bz2
+    if args.result_id:
+        members = [x for x in members if x.name.split('.')[1] in args.result_id]
+
+    if not args.output or args.output == '-':
+        write_members(sys.stdout.buffer, args.archive, members, select_compression(args), args.jobs)
+
+    else:
+        with open(args.output, 'wb') as fout:
+            write_members(fout, args.archive, members, select_compression(args), args.jobs)
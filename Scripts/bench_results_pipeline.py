@@ -0,0 +1,108 @@
+#!/bin/python3
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                                                                           #
+#   OpenBench is a chess engine testing framework by Andrew Grant.          #
+#   <https://github.com/AndyGrant/OpenBench>  <andrew@grantnet.us>          #
+#                                                                           #
+#   OpenBench is free software: you can redistribute it and/or modify       #
+#   it under the terms of the GNU General Public License as published by    #
+#   the Free Software Foundation, either version 3 of the License, or       #
+#   (at your option) any later version.                                     #
+#                                                                           #
+#   OpenBench is distributed in the hope that it will be useful,            #
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#   GNU General Public License for more details.                            #
+#                                                                           #
+#   You should have received a copy of the GNU General Public License       #
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.   #
+#                                                                           #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# Measures the worker's cost of parsing match runner output. Each runner is fed
+# synthetic fastchess output at a fixed rate, by re-invoking this script with
+# --emit, and parsed by worker.py:run_and_parse_runner() into a ResultsChannel.
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Needed to include from ../Client/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+
+import worker
+
+def emit_synthetic_output(rate, duration):
+
+    # Each game produces a Started, Finished, and Score line, like fastchess
+    template = [
+        'Started game %d of 1000000 (Engine-dev vs Engine-base)\n',
+        'Finished game %d (Engine-dev vs Engine-base): %s {%s}\n',
+        'Score of Engine-dev vs Engine-base: 0 - 0 - 0  [0.500] %d\n',
+    ]
+
+    reasons = [ 'White wins by adjudication', 'Draw by adjudication', 'Black loses on time' ]
+    results = [ '1-0', '1/2-1/2', '0-1' ]
+
+    start, written, game = time.time(), 0, 0
+    while (elapsed := time.time() - start) < duration:
+
+        # Write in small bursts, to hold the average rate
+        while written < int(elapsed * rate):
+            game += 1
+            x = random.randrange(3)
+            sys.stdout.write(template[0] % (game))
+            sys.stdout.write(template[1] % (game, results[x], reasons[x]))
+            sys.stdout.write(template[2] % (game))
+            written += 3
+
+        sys.stdout.flush()
+        time.sleep(0.01)
+
+def run_pipeline(runners, rate, duration):
+
+    command    = '%s %s --emit --rate %d --duration %d' % (sys.executable, os.path.abspath(__file__), rate, duration)
+    channel    = worker.ResultsChannel(runners)
+    abort_flag = threading.Event()
+
+    start_time = time.time()
+    start_cpu  = time.process_time()
+
+    # Match runner output is printed by the worker, which is not what is being measured
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=runners) as executor:
+            for x in range(runners):
+                executor.submit(worker.run_and_parse_runner, None, command, x, channel, abort_flag)
+
+    elapsed = time.time() - start_time
+    cpu     = time.process_time() - start_cpu
+    pairs   = sum(sum(batch['pentanomial']) for batch in channel.collect())
+
+    print ('Runners          | %d' % (runners))
+    print ('Lines per Second | %d per runner' % (rate))
+    print ('Game Pairs       | %d' % (pairs))
+    print ('Elapsed          | %.3f seconds' % (elapsed))
+    print ('Parsing CPU Time | %.3f seconds (%.2f%% of one core)' % (cpu, 100 * cpu / elapsed))
+
+if __name__ == '__main__':
+
+    p = argparse.ArgumentParser()
+    p.add_argument('-R', '--runners' , help='Concurrent match runners', default=1, type=int)
+    p.add_argument(      '--rate'    , help='Lines per second, per runner', default=10000, type=int)
+    p.add_argument(      '--duration', help='Seconds to run for', default=10, type=int)
+    p.add_argument(      '--emit'    , help='Only write synthetic output', action='store_true')
+    args = p.parse_args()
+
+    if args.emit:
+        emit_synthetic_output(args.rate, args.duration)
+
+    else:
+        run_pipeline(args.runners, args.rate, args.duration)
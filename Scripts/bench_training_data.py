@@ -0,0 +1,88 @@
+#!/bin/python3
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                                                                           #
+#   OpenBench is a chess engine testing framework by Andrew Grant.          #
+#   <https://github.com/AndyGrant/OpenBench>  <andrew@grantnet.us>          #
+#                                                                           #
+#   OpenBench is free software: you can redistribute it and/or modify       #
+#   it under the terms of the GNU General Public License as published by    #
+#   the Free Software Foundation, either version 3 of the License, or       #
+#   (at your option) any later version.                                     #
+#                                                                           #
+#   OpenBench is distributed in the hope that it will be useful,            #
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#   GNU General Public License for more details.                            #
+#                                                                           #
+#   You should have received a copy of the GNU General Public License       #
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.   #
+#                                                                           #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# Measures the server's cost of turning DATAGEN PGNs into training data. PGNs are
+# stripped and compressed exactly as a worker would upload them, and then passed
+# through OpenBench/training_data.py:extract_training_data() one at a time, as
+# the PGNWatcher does. Costs are per game and per position, so the results hold
+# regardless of how many workers are uploading.
+
+import argparse
+import bz2
+import os
+import sys
+import tempfile
+import time
+
+# Needed to include from ../Client/*.py, and ../OpenBench/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+sys.path.append(os.path.abspath(PARENT))
+
+import pgn_util
+
+from OpenBench.training_data import extract_training_data, POSITION_SIZE
+
+def run_pipeline(pgns, copies, compact):
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+
+        # Each upload is a bz2 of the stripped PGN, like worker.py sends
+        uploads = []
+        for x, pgn in enumerate(pgns * copies):
+            uploads.append(os.path.join(temp_dir, '%d.pgn.bz2' % (x)))
+            with open(uploads[-1], 'wb') as fout:
+                fout.write(bz2.compress(pgn_util.strip_entire_pgn(pgn, 1.0, compact).encode()))
+
+        out_path   = os.path.join(temp_dir, 'positions.bin')
+        start_time = time.time()
+        start_cpu  = time.process_time()
+
+        games, positions = 0, 0
+        for upload in uploads:
+            read, written = extract_training_data(upload, out_path)
+            games, positions = games + read, positions + written
+
+        elapsed = time.time() - start_time
+        cpu     = time.process_time() - start_cpu
+        size    = sum(os.path.getsize(x) for x in uploads)
+
+        assert os.path.getsize(out_path) == positions * POSITION_SIZE
+
+    print ('Uploads          | %d (%.2f MB compressed)' % (len(uploads), size / 1024 / 1024))
+    print ('Games            | %d (%.1f per second)' % (games, games / elapsed))
+    print ('Positions        | %d (%.1f per second)' % (positions, positions / elapsed))
+    print ('Output           | %.2f MB' % (positions * POSITION_SIZE / 1024 / 1024))
+    print ('Elapsed          | %.3f seconds' % (elapsed))
+    print ('CPU per Position | %.2f microseconds' % (1e6 * cpu / max(1, positions)))
+
+if __name__ == '__main__':
+
+    examples = [os.path.join(PARENT, 'UnitTests', 'example%d.pgn' % (x)) for x in range(1, 4)]
+
+    p = argparse.ArgumentParser()
+    p.add_argument(      'pgns'     , help='Match runner PGNs to use', nargs='*', default=examples)
+    p.add_argument('-C', '--copies' , help='Uploads made from each PGN', default=10, type=int)
+    p.add_argument(      '--verbose', help='Strip PGNs as verbose, not compact', action='store_true')
+    args = p.parse_args()
+
+    run_pipeline(args.pgns, args.copies, not args.verbose)
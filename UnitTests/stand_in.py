@@ -0,0 +1,32 @@
+# Shared by the tests which need a stand-in for the OpenBench server, or GitHub.
+# Each test subclasses Handler with its own endpoints, and counters, and then
+# calls serve() to run it on a free local port, for the life of the test.
+
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Handler(BaseHTTPRequestHandler):
+
+    ## Keep-alive, unbuffered, and quiet. Subclasses only add do_GET() and do_POST()
+
+    protocol_version        = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, data=b'', headers=None):
+        self.send_response(status)
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve(handler):
+
+    # Returns the server, to later shutdown(), and its URL with a trailing slash
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:%d/' % (server.server_address[1])
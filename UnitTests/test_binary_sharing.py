@@ -0,0 +1,104 @@
+#!/bin/python3
+
+import email.parser
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import urllib.parse
+
+# Needed to include from ../Client/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+
+import stand_in
+import utils
+
+BINARY_KEY_FIELDS = ('engine', 'sha', 'network', 'compiler', 'tier', 'os_name')
+
+class StandInHandler(stand_in.Handler):
+
+    ## Minimal stand-in for the binary sharing endpoints of the OpenBench server.
+    ## Binaries are held in memory, keyed the same way as the Binary model
+
+    binaries = {} # Key: Tuple of BINARY_KEY_FIELDS, Value: sha256
+    contents = {} # Key: sha256, Value: bytes
+    corrupt  = False
+
+    def reply(self, data, content_type='application/json'):
+        data = json.dumps(data).encode() if content_type == 'application/json' else data
+        self.send_body(200, data, { 'Content-Type' : content_type })
+
+    def read_fields(self):
+
+        body = self.rfile.read(int(self.headers['Content-Length']))
+
+        if self.headers['Content-Type'].startswith('multipart/form-data'):
+            header  = b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n'
+            message = email.parser.BytesParser().parsebytes(header + body)
+            parts   = { part.get_param('name', header='content-disposition') : part.get_payload(decode=True)
+                for part in message.get_payload() }
+            return { k : v if k == 'binary' else v.decode() for k, v in parts.items() }
+
+        return { k : v[0] for k, v in urllib.parse.parse_qs(body.decode()).items() }
+
+    def do_POST(self):
+
+        fields = self.read_fields()
+        key    = tuple(fields.get(x, '') for x in BINARY_KEY_FIELDS)
+
+        if self.path == '/clientFindBinary/':
+            sha256 = StandInHandler.binaries.get(key)
+            return self.reply({ 'sha256' : sha256 } if sha256 else {})
+
+        if self.path == '/clientGetBinary/':
+            data = StandInHandler.contents[fields['sha256']]
+            return self.reply(data[::-1] if StandInHandler.corrupt else data, 'application/octet-stream')
+
+        if self.path == '/clientSubmitBinary/':
+            sha256 = hashlib.sha256(fields['binary']).hexdigest()
+            StandInHandler.binaries.setdefault(key, sha256)
+            StandInHandler.contents[sha256] = fields['binary']
+            return self.reply({ 'sha256' : sha256 })
+
+def verify_binary_sharing(server_url, temp_dir):
+
+    credentials = { 'machine_id' : 1, 'secret' : 'secret' }
+    fields      = utils.shared_binary_fields('Engine', 'abcdef12', 'Networks/1234ABCD', 'g++', '13.2.0', ['AVX2', 'POPCNT'])
+    other       = utils.shared_binary_fields('Engine', 'abcdef12', 'Networks/1234ABCD', 'g++', '13.2.0', ['POPCNT'])
+
+    built = os.path.join(temp_dir, 'built')
+    with open(built, 'wb') as fout:
+        fout.write(os.urandom(64 * 1024))
+
+    # Nothing shared yet, so we would have to build
+    out_path = os.path.join(temp_dir, 'fetched')
+    assert not utils.download_shared_binary(server_url, credentials, fields, out_path)
+
+    # After an upload, an identical machine gets the same binary, and may execute it
+    utils.upload_shared_binary(server_url, credentials, fields, built)
+    assert utils.download_shared_binary(server_url, credentials, fields, out_path)
+    assert open(utils.check_for_engine_binary(out_path), 'rb').read() == open(built, 'rb').read()
+    assert os.access(utils.check_for_engine_binary(out_path), os.X_OK)
+
+    # Machines with a different CPU flag tier must not see it
+    assert not utils.download_shared_binary(server_url, credentials, other, out_path + '-other')
+
+    # Corrupted transfers are rejected, and leave nothing behind
+    StandInHandler.corrupt = True
+    assert not utils.download_shared_binary(server_url, credentials, fields, out_path + '-corrupt')
+    assert not os.path.exists(out_path + '-corrupt')
+    assert len(os.listdir(temp_dir)) == 2
+
+    # Random bytes are not an engine
+    assert not utils.engine_speaks_uci(utils.check_for_engine_binary(out_path))
+
+if __name__ == '__main__':
+
+    server, server_url = stand_in.serve(StandInHandler)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        verify_binary_sharing(server_url, temp_dir)
+
+    server.shutdown()
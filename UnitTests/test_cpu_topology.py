@@ -0,0 +1,45 @@
+#!/bin/python3
+
+import os
+import sys
+
+# Needed to include from ../Client/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+
+import utils
+
+def synthetic_topology(domains, cores, smt):
+
+    # Numbered like Linux, with every first sibling before any second sibling
+    total = domains * cores
+    return [[[d * cores + c + s * total for s in range(smt)] for c in range(cores)] for d in range(domains)]
+
+def verify_partition_cpus():
+
+    # Whole cache domains, when they divide evenly
+    topology = synthetic_topology(4, 4, 2)
+    parts    = utils.partition_cpus(topology, 2, 4)
+    assert parts == [set(sum(topology[0] + topology[1], [])), set(sum(topology[2] + topology[3], []))]
+
+    # 4 CCXs of 3 cores, for 3 runners, must not give sets of 3, 3, and 6 cores
+    topology = synthetic_topology(4, 3, 1)
+    parts    = utils.partition_cpus(topology, 3, 2)
+    assert [len(x) for x in parts] == [4, 4, 4]
+
+    # Domains too small for the games of each runner are split by core instead
+    topology = synthetic_topology(4, 2, 2)
+    parts    = utils.partition_cpus(topology, 4, 3)
+    assert [len(x) for x in parts] == [4, 4, 4, 4]
+    assert utils.partition_cpus(topology, 2, 3) == [set(sum(topology[0] + topology[1], [])), set(sum(topology[2] + topology[3], []))]
+
+    # Uneven core counts leave the remainder unused, and siblings stay together
+    parts = utils.partition_cpus(synthetic_topology(1, 10, 2), 3)
+    assert [len(x) for x in parts] == [6, 6, 6] and not set.intersection(*parts)
+    assert all(cpu + 10 in part for part in parts for cpu in part if cpu < 10)
+
+    # Not enough cores to go around
+    assert utils.partition_cpus(synthetic_topology(1, 2, 1), 3) is None
+
+if __name__ == '__main__':
+    verify_partition_cpus()
@@ -0,0 +1,113 @@
+#!/bin/python3
+
+import gzip
+import json
+import os
+import sys
+import time
+
+# Needed to include from ../Client/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+
+import requests
+import stand_in
+import utils
+
+class StandInHandler(stand_in.Handler):
+
+    ## Minimal stand-in for the OpenBench server. Counts TCP connections, echoes
+    ## details about request bodies, and fails /flaky until told to recover
+
+    connections    = 0
+    flaky_failures = 0
+
+    def setup(self):
+        StandInHandler.connections += 1
+        super().setup()
+
+    def reply(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode(), { 'Content-Type' : 'application/json' })
+
+    def do_GET(self):
+
+        if self.path == '/flaky' and StandInHandler.flaky_failures:
+            StandInHandler.flaky_failures -= 1
+            return self.reply(503, {})
+
+        self.reply(200, { 'path' : self.path })
+
+    def do_POST(self):
+
+        body     = self.rfile.read(int(self.headers['Content-Length']))
+        encoding = self.headers.get('Content-Encoding', '')
+
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+
+        self.reply(200, { 'encoding' : encoding, 'length' : len(body), 'body' : body.decode() })
+
+def measure(server_url, fetch, requests_cnt=200):
+
+    StandInHandler.connections = 0
+    start = time.time()
+
+    for x in range(requests_cnt):
+        assert fetch(server_url).json()['path'] == '/'
+
+    return time.time() - start, StandInHandler.connections
+
+def verify_connection_reuse(server_url):
+
+    bare_time, bare_conns = measure(server_url, lambda url: requests.get(url))
+    pool_time, pool_conns = measure(server_url, lambda url: utils.http_request('GET', url))
+
+    print ('requests.get()        : %.3fs over %d connections' % (bare_time, bare_conns))
+    print ('utils.http_request()  : %.3fs over %d connections' % (pool_time, pool_conns))
+
+    # The shared session must hold a single keep-alive connection open
+    assert pool_conns == 1 and bare_conns > pool_conns
+
+def verify_gzip_bodies(server_url):
+
+    # Small bodies are never worth compressing
+    small = utils.http_request('POST', server_url, data={ 'x' : 'y' }, compress=True).json()
+    assert small['encoding'] == '' and small['body'] == 'x=y'
+
+    # Large, compressible bodies arrive intact after being gzipped
+    text  = 'Finished game 1 (dev vs base): 1-0 {White mates}\n' * 4096
+    large = utils.http_request('POST', server_url, data={ 'log' : text }, compress=True).json()
+    assert large['encoding'] == 'gzip' and large['length'] == len(requests.compat.urlencode({ 'log' : text }))
+
+    # Requests that did not opt in are never compressed
+    plain = utils.http_request('POST', server_url, data={ 'log' : text }).json()
+    assert plain['encoding'] == ''
+
+def verify_retries(server_url):
+
+    utils.HTTP_BACKOFF = 0.01
+
+    # Idempotent requests recover from transient 503s
+    StandInHandler.flaky_failures = 2
+    assert utils.http_request('GET', server_url + 'flaky', idempotent=True).status_code == 200
+
+    # Anything else sees the very first failure
+    StandInHandler.flaky_failures = 1
+    assert utils.http_request('GET', server_url + 'flaky').status_code == 503
+
+    # Connection failures are retried, and then raised, for idempotent requests
+    try:
+        utils.http_request('GET', 'http://127.0.0.1:1/', idempotent=True)
+        assert False
+    except requests.ConnectionError:
+        pass
+
+if __name__ == '__main__':
+
+    server, server_url = stand_in.serve(StandInHandler)
+
+    verify_connection_reuse(server_url)
+    verify_gzip_bodies(server_url)
+    verify_retries(server_url)
+
+    server.shutdown()
@@ -0,0 +1,122 @@
+#!/bin/python3
+
+import hashlib
+import lzma
+import os
+import re
+import sys
+import tempfile
+
+# Needed to include from ../Client/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+
+import stand_in
+import utils
+
+NETWORK     = os.urandom(64 * 1024) * 80 + os.urandom(123)
+NETWORK_SHA = hashlib.sha256(NETWORK).hexdigest()[:8].upper()
+NETWORK_XZ  = lzma.compress(NETWORK)
+
+class StandInHandler(stand_in.Handler):
+
+    ## Minimal stand-in for /api/networks/, which honours Range requests, offers
+    ## an xz variant, and can be told to drop the connection part way through the
+    ## next responses. Counts the bytes sent, to compare plain and xz transfers
+
+    drops    = 0
+    ranges   = []
+    offer_xz = False
+    sent     = 0
+
+    def do_POST(self):
+
+        self.rfile.read(int(self.headers['Content-Length']))
+
+        start = 0
+        if (match := re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))):
+            start = int(match.group(1))
+
+        StandInHandler.ranges.append(start)
+        if start >= len(NETWORK):
+            return self.send_body(416)
+
+        # Ranges always refer to the plain Network
+        use_xz = StandInHandler.offer_xz and not start and 'xz' in self.headers.get('Accept-Encoding', '')
+        data   = NETWORK_XZ if use_xz else NETWORK[start:]
+
+        self.send_response(206 if start else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        if use_xz: self.send_header('Content-Encoding', 'xz')
+        self.end_headers()
+
+        # Send only a third of what was promised, then hang up
+        if StandInHandler.drops:
+            StandInHandler.drops -= 1
+            data = data[:len(data) // 3]
+            self.close_connection = True
+
+        StandInHandler.sent += len(data)
+        self.wfile.write(data)
+
+def verify_resumed_download(server_url, temp_dir):
+
+    utils.HTTP_BACKOFF = 0.01
+    net_path = os.path.join(temp_dir, NETWORK_SHA)
+
+    # Two interruptions, each resumed from where the last one stopped
+    StandInHandler.drops, StandInHandler.ranges = 2, []
+    utils.download_network(server_url, 'user', 'pass', 'Engine', 'net.nnue', NETWORK_SHA, net_path)
+    assert open(net_path, 'rb').read() == NETWORK
+    assert StandInHandler.ranges[0] == 0 and 0 < StandInHandler.ranges[1] < StandInHandler.ranges[2]
+    assert not os.path.exists(net_path + '.partial')
+
+    # A partial file left over from an earlier session is resumed, not restarted
+    os.remove(net_path)
+    with open(net_path + '.partial', 'wb') as fout:
+        fout.write(NETWORK[:1000])
+
+    StandInHandler.ranges = []
+    utils.download_network(server_url, 'user', 'pass', 'Engine', 'net.nnue', NETWORK_SHA, net_path)
+    assert open(net_path, 'rb').read() == NETWORK and StandInHandler.ranges == [1000]
+
+    # Corrupted partial files are caught, and nothing is left behind
+    os.remove(net_path)
+    with open(net_path + '.partial', 'wb') as fout:
+        fout.write(os.urandom(1000))
+
+    try:
+        utils.download_network(server_url, 'user', 'pass', 'Engine', 'net.nnue', NETWORK_SHA, net_path)
+        assert False
+    except utils.OpenBenchCorruptedNetworkException:
+        assert not os.path.exists(net_path) and not os.path.exists(net_path + '.partial')
+
+def verify_compressed_download(server_url, temp_dir):
+
+    net_path = os.path.join(temp_dir, NETWORK_SHA)
+    StandInHandler.offer_xz = True
+
+    # Only the compressed variant crosses the wire, but the plain Network is saved
+    StandInHandler.sent = 0
+    utils.download_network(server_url, 'user', 'pass', 'Engine', 'net.nnue', NETWORK_SHA, net_path)
+    assert open(net_path, 'rb').read() == NETWORK and StandInHandler.sent == len(NETWORK_XZ)
+    assert StandInHandler.sent < len(NETWORK) // 4
+
+    # An interrupted xz transfer leaves a plain prefix, which is resumed with a Range
+    os.remove(net_path)
+    StandInHandler.drops, StandInHandler.ranges = 1, []
+    utils.download_network(server_url, 'user', 'pass', 'Engine', 'net.nnue', NETWORK_SHA, net_path)
+    assert open(net_path, 'rb').read() == NETWORK and StandInHandler.ranges[0] == 0
+
+if __name__ == '__main__':
+
+    server, server_url = stand_in.serve(StandInHandler)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        verify_resumed_download(server_url, temp_dir)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        verify_compressed_download(server_url, temp_dir)
+
+    server.shutdown()
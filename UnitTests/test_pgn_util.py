@@ -1,5 +1,6 @@
 #!/bin/python3
 
+import bz2
 import os
 import sys
 import re
@@ -9,6 +10,7 @@ PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
 sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
 
 from pgn_util import pgn_iterator, pgn_strip_movelist
+from pgn_util import process_runner_pgn, strip_entire_pgn
 from pgn_util import REGEX_COMMENT_COMPACT, REGEX_COMMENT_VERBOSE
 
 def verify_stripped_move_list(move_list, compact):
@@ -19,8 +21,27 @@ def verify_stripped_move_list(move_list, compact):
     for move, comment in re.findall(r'([a-zA-Z0-9+=#-]+)\s\{([^}]*)\}', move_list):
         assert comment in special_comments or comment_regex.match(comment)
 
+def verify_processed_runner_pgn(example_pgn, compact):
+
+    compressed, errors, offset = process_runner_pgn(example_pgn, 0, 1.0, compact, True)
+    assert bz2.decompress(compressed).decode() == strip_entire_pgn(example_pgn, 1.0, compact)
+    assert offset == os.path.getsize(example_pgn)
+
+    # Tailing the PGN while in progress, and then finishing it, must see every game once
+    partial, _, offset = process_runner_pgn(example_pgn, 0, 1.0, compact, True, final=False)
+    remains, _, offset = process_runner_pgn(example_pgn, offset, 1.0, compact, True, final=True)
+    assert bz2.decompress(partial + remains) == bz2.decompress(compressed)
+    assert offset == os.path.getsize(example_pgn)
+
+    # Each error should be the entire original game, starting with its headers
+    for error, pgn in errors:
+        assert error in [ 'Disconnect', 'Stalled', 'Illegal Move' ]
+        assert pgn.startswith('[Event ')
+
 if __name__ == '__main__':
     for example_pgn in [ 'example1.pgn', 'example2.pgn', 'example3.pgn', ]:
         for headers, move_list in pgn_iterator(example_pgn):
             for compact in [ True, False ]:
                 verify_stripped_move_list(pgn_strip_movelist(move_list, compact), compact)
+        for compact in [ True, False ]:
+            verify_processed_runner_pgn(example_pgn, compact)
@@ -0,0 +1,112 @@
+#!/bin/python3
+
+import os
+import sys
+import tempfile
+import time
+import urllib.parse
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Needed to include from ../Client/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+
+import relay
+import stand_in
+import utils
+
+ARTIFACT = os.urandom(3 * 1024 * 1024 + 17)
+
+class UpstreamHandler(stand_in.Handler):
+
+    ## Minimal stand-in for GitHub or the OpenBench server. Slow to answer, so that
+    ## concurrent requests overlap, and counts how often each artifact was fetched
+
+    fetches = {}
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+
+        length = int(self.headers.get('Content-Length', 0))
+        fields = urllib.parse.parse_qs(self.rfile.read(length).decode()) if length else {}
+
+        UpstreamHandler.fetches[self.path] = UpstreamHandler.fetches.get(self.path, 0) + 1
+        time.sleep(0.25)
+
+        # Like the OpenBench server, some failures are reported as JSON
+        if self.path.startswith('/api/') and fields.get('username') == ['disabled']:
+            return self.send_body(200, b'{}', { 'Content-Type' : 'application/json' })
+
+        # Credentials in the body must reach the upstream server intact
+        if self.path.startswith('/api/') and fields.get('username') != ['user']:
+            return self.send_body(403)
+
+        self.send_body(200, ARTIFACT, { 'Content-Type' : 'application/octet-stream' })
+
+def verify_relay(upstream_url, relay_url):
+
+    utils.HTTP_RELAY = relay_url
+    fetch = lambda path, **kwargs: utils.http_request('GET', upstream_url + path, relay=60, **kwargs)
+
+    # Concurrent requests for one artifact share a single upstream fetch
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda x: fetch('book.zip'), range(8)))
+
+    assert all(x.status_code == 200 and x.content == ARTIFACT for x in responses)
+    assert UpstreamHandler.fetches['/book.zip'] == 1
+
+    # Later requests are answered from the cache, including Ranges to resume downloads
+    response = fetch('book.zip', headers={ 'Range' : 'bytes=1000-' })
+    assert response.status_code == 206 and response.content == ARTIFACT[1000:]
+    assert UpstreamHandler.fetches['/book.zip'] == 1
+
+    # Requests which are not marked as artifacts never touch the relay
+    utils.http_request('GET', upstream_url + 'book.zip')
+    assert UpstreamHandler.fetches['/book.zip'] == 2
+
+    # POST bodies are forwarded, and failures are passed back without being cached
+    post = lambda username: utils.http_request('POST', upstream_url + 'api/networks/E/ABCD',
+        data={ 'username' : username, 'password' : 'pass' }, relay=60)
+
+    assert post('intruder').status_code == 403
+    assert post('user').content == ARTIFACT and post('user').content == ARTIFACT
+    assert UpstreamHandler.fetches['/api/networks/E/ABCD'] == 2
+
+    # Cached copies are only served to the same credentials that fetched them
+    assert post('intruder').status_code == 403
+    assert UpstreamHandler.fetches['/api/networks/E/ABCD'] == 3
+
+    # Errors reported as JSON are not cached either
+    assert post('disabled').content == b'{}' and post('disabled').content == b'{}'
+    assert UpstreamHandler.fetches['/api/networks/E/ABCD'] == 5
+
+    # Only the OpenBench server and GitHub may be named as targets
+    response = utils.http_request('GET', relay_url + 'relay', headers={ 'X-Relay-Target' : 'http://127.0.0.2:1/' })
+    assert response.status_code == 403
+
+    # Stale copies are fetched again
+    assert utils.http_request('GET', upstream_url + 'book.zip', relay=0).content == ARTIFACT
+    assert UpstreamHandler.fetches['/book.zip'] == 3
+
+    # An unreachable relay falls back to fetching directly
+    utils.HTTP_RELAY = 'http://127.0.0.1:1/'
+    assert fetch('engine.zip').content == ARTIFACT
+
+if __name__ == '__main__':
+
+    upstream, upstream_url = stand_in.serve(UpstreamHandler)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+
+        relay.RelayHandler.log_message = lambda *args: None
+        relay.RelayHandler.cache    = relay.RelayCache(temp_dir, 64 * 1024 * 1024)
+        relay.RelayHandler.upstream = ('http', urllib.parse.urlsplit(upstream_url).netloc)
+        relay_server, relay_url     = stand_in.serve(relay.RelayHandler)
+
+        verify_relay(upstream_url, relay_url)
+        relay_server.shutdown()
+
+    upstream.shutdown()
@@ -0,0 +1,74 @@
+#!/bin/python3
+
+import bz2
+import io
+import os
+import sys
+import tempfile
+
+# Needed to include from ../Client/*.py, and ../OpenBench/*.py
+PARENT = os.path.join(os.path.dirname(__file__), os.path.pardir)
+sys.path.append(os.path.abspath(os.path.join(PARENT, 'Client')))
+sys.path.append(os.path.abspath(PARENT))
+
+from pgn_util import strip_entire_pgn
+
+from OpenBench.training_data import Position, POSITION_SIZE
+from OpenBench.training_data import extract_training_data, game_positions, pgn_games, unpack_position
+
+def verify_replayed_moves():
+
+    # Promotions, castling rights lost to a capture, and castling itself
+    position = Position()
+    for san in 'e4 d5 exd5 c5 dxc6 Nf6 cxb7 Nbd7 bxa8=Q Qa5 Nf3 Qxa2 Bc4 Qxb1 O-O e5'.split():
+        position.play_san(san)
+    assert position.fen() == 'Q1b1kb1r/p2n1ppp/5n2/4p3/2B5/5N2/1PPP1PPP/RqBQ1RK1 w k - 0 9'
+
+    # Only the Knight that is not pinned may go to e2
+    position = Position('4k3/8/8/8/1b6/2N5/8/4K1N1 w - - 0 1')
+    position.play_san('Ne2')
+    assert position.fen() == '4k3/8/8/8/1b6/2N5/4N3/4K3 b - - 1 1'
+
+    # En-passant squares are only kept when a capture is possible
+    position = Position('rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 3')
+    position.play_san('c4')
+    assert position.fen() == 'rnbqkbnr/ppp1pppp/8/8/2PpP3/8/PP1P1PPP/RNBQKBNR b KQkq c3 0 3'
+    position.play_san('dxc3')
+    assert position.fen() == 'rnbqkbnr/ppp1pppp/8/8/4P3/2p5/PP1P1PPP/RNBQKBNR w KQkq - 0 4'
+
+    # FRC castling, where the Rooks are not in the corners
+    position = Position('1rk2r2/8/8/8/8/8/8/1RK2R2 w KQkq - 0 1')
+    position.play_san('O-O')
+    position.play_san('O-O-O')
+    assert position.fen() == '2kr1r2/8/8/8/8/8/8/1R3RK1 w - - 2 2'
+
+def verify_packed_positions(example_pgn):
+
+    # Each game must replay until the end, with one record per scored move
+    stripped = strip_entire_pgn(example_pgn, 1.0, True)
+    for headers, movetext in pgn_games(io.StringIO(stripped)):
+
+        records = list(game_positions(headers, movetext))
+        scored  = movetext.count('{') - movetext.count('{book}') - movetext.count('{unknown}')
+        assert len(records) == scored
+
+        fen, score, result = unpack_position(records[0])
+        assert all(len(x) == POSITION_SIZE for x in records)
+        assert result == { '0-1' : 0, '1/2-1/2' : 1, '1-0' : 2 }[headers['Result']]
+        assert headers.get('FEN') in (None, fen)
+
+    # Uploads are compressed, and extraction appends to what is already there
+    with tempfile.TemporaryDirectory() as temp_dir:
+
+        pgn_path, out_path = os.path.join(temp_dir, 'upload.pgn.bz2'), os.path.join(temp_dir, 'out.bin')
+        with open(pgn_path, 'wb') as fout:
+            fout.write(bz2.compress(stripped.encode()))
+
+        games, written = extract_training_data(pgn_path, out_path)
+        assert extract_training_data(pgn_path, out_path) == (games, written)
+        assert os.path.getsize(out_path) == 2 * written * POSITION_SIZE
+
+if __name__ == '__main__':
+    verify_replayed_moves()
+    for example_pgn in [ 'example1.pgn', 'example2.pgn', 'example3.pgn', ]:
+        verify_packed_positions(example_pgn)